@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,9 +24,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-r5o)1e@!c7a0l=*cut$rbgj&2klptdy+td3gzk&smgv++_#b40'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') != '0'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -42,11 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'journal.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.RoleMiddleware',
+    'journal.middleware.GradeHistoryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,7 +59,8 @@ ROOT_URLCONF = 'SchoolDiary.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The stock Django backend, timing each render for journal.metrics.
+        'BACKEND': 'journal.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
         'APP_DIRS': True,
@@ -75,13 +80,92 @@ WSGI_APPLICATION = 'SchoolDiary.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE selects the backend: 'sqlite' (default) or 'postgresql'.
+# DJANGO_DB_PROFILE=production switches SQLite to WAL journaling with tuned
+# pragmas, IMMEDIATE write transactions and persistent connections.
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'development')
+
+if DB_ENGINE == 'postgresql':
+    # Requires psycopg 3 with the pool extra: pip install "psycopg[binary,pool]".
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'schooldiary'),
+            'USER': os.environ.get('POSTGRES_USER', 'schooldiary'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        }
+    }
+    if os.environ.get('DJANGO_DB_POOL', '1') == '1':
+        # The pool keeps connections open itself, so CONN_MAX_AGE must stay 0.
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.environ.get('DJANGO_DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    else:
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+        })
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+if DB_ENGINE != 'postgresql' and DB_PROFILE == 'production':
+    # busy_timeout goes first so the remaining pragmas already wait for locks.
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT', 5000)),
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': int(os.environ.get('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('DJANGO_SQLITE_CACHE_SIZE', -64000)),
+        'temp_store': 'MEMORY',
     }
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Rendered student pages go to the 'pages' cache: DJANGO_PAGE_CACHE=locmem
+# (default, per process) or DJANGO_PAGE_CACHE=file shared via DJANGO_PAGE_CACHE_DIR.
+# Either is safe with several workers: the versions that expire pages are kept
+# in the database (journal.PageVersion), so only hit rates differ.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+if os.environ.get('DJANGO_PAGE_CACHE') == 'file':
+    CACHES['pages'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_PAGE_CACHE_DIR', BASE_DIR / 'cache' / 'pages'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
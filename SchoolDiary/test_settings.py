@@ -0,0 +1,12 @@
+"""Settings for the test suite: the project settings with cheaper password hashing."""
+
+from .settings import *  # noqa: F401,F403
+
+# PBKDF2 is deliberately slow; every create_user() and login() in the tests would pay for it.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DEBUG = False
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Also what each --parallel worker gets.
+    DATABASES['default']['TEST'] = {'NAME': ':memory:'}
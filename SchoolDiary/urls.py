@@ -21,6 +21,7 @@ from django.http import HttpResponse
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('journal/', include('journal.urls')),
+    path('ops/', include('journal.ops_urls')),
     path('favicon.ico', lambda request: HttpResponse(status=204)),
     path('', include('users.urls')),
 ]
@@ -0,0 +1,225 @@
+"""Read throughput of the journal pages under uvicorn (ASGI) and gunicorn (WSGI).
+
+Builds a school in a temporary SQLite database, logs in a teacher or student
+for every simulated client, then lets all clients loop over their read pages
+(lesson list and detail, grade list, home) over keep-alive connections. Needs
+uvicorn and gunicorn installed. Run from the project root:
+
+    python benchmarks/asgi_vs_wsgi.py --clients 500 --seconds 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SERVERS = ('uvicorn', 'gunicorn')
+
+
+def server_env(path):
+    return {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'SchoolDiary.settings',
+        'DJANGO_DB_PROFILE': 'production',
+        'DJANGO_SQLITE_PATH': path,
+        'DJANGO_DEBUG': '0',
+        'DJANGO_ALLOWED_HOSTS': '127.0.0.1',
+    }
+
+
+def prepare(path, classes, class_size, lessons_per_class):
+    """Create the school and return one (session cookie, urls) pair per user."""
+    os.environ.update(server_env(path))
+    import django
+    django.setup()
+    from datetime import date, timedelta
+
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Group
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.core.management import call_command
+    from django.urls import reverse
+
+    from journal.models import Grade, Lesson, SchoolClass, Subject
+    from journal.stats import rebuild_stats
+    from users.models import User
+    from users.roles import STUDENTS_GROUP, TEACHERS_GROUP
+
+    call_command('migrate', verbosity=0)
+    password = make_password('bench')
+    teachers_group = Group.objects.create(name=TEACHERS_GROUP)
+    students_group = Group.objects.create(name=STUDENTS_GROUP)
+    subjects = Subject.objects.bulk_create(Subject(name=f'Subject {n}') for n in range(8))
+    teachers = User.objects.bulk_create(User(username=f'teacher{n}', password=password) for n in range(classes))
+    teachers_group.user_set.add(*teachers)
+    students = []
+    today = date.today()
+    for n, teacher in enumerate(teachers):
+        school_class = SchoolClass.objects.create(name=f'Class {n}')
+        members = User.objects.bulk_create(
+            User(username=f'student{n}-{i}', password=password) for i in range(class_size)
+        )
+        school_class.student.add(*members)
+        students_group.user_set.add(*members)
+        students += members
+        lessons = Lesson.objects.bulk_create(
+            Lesson(topic=f'Class {n} lesson {i}', subject=subjects[i % len(subjects)], school_class=school_class,
+                   teacher=teacher, date=today - timedelta(days=i))
+            for i in range(lessons_per_class)
+        )
+        Grade.objects.bulk_create(
+            Grade(student=student, lesson=lesson, grade=random.randint(1, 12))
+            for lesson in lessons for student in members if random.random() < 0.6
+        )
+    rebuild_stats()
+
+    def session_for(user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    users = []
+    for teacher in teachers:
+        lesson_ids = list(teacher.lessons.values_list('id', flat=True)[:10])
+        urls = [reverse('teacher_lesson_list')] + [
+            reverse('teacher_lesson_detail', kwargs={'lesson_id': pk}) for pk in lesson_ids
+        ]
+        users.append((session_for(teacher), urls))
+    for student in students:
+        urls = [reverse('home'), reverse('grade_list'), reverse('grade_list') + '?group=subject']
+        users.append((session_for(student), urls))
+    return users
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, path, port, workers, threads):
+    if name == 'uvicorn':
+        command = [sys.executable, '-m', 'uvicorn', 'SchoolDiary.asgi:application', '--port', str(port),
+                   '--workers', str(workers), '--no-access-log', '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', 'SchoolDiary.wsgi:application', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads), '--worker-class', 'gthread',
+                   '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=ROOT, env=server_env(path))
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit(f"{name} did not start.")
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    chunked = False
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if not chunked:
+        await reader.readexactly(length)
+        return status
+    while size := int((await reader.readline()).strip(), 16):
+        await reader.readexactly(size + 2)
+    await reader.readline()
+    return status
+
+
+async def client(port, session_key, urls, deadline, latencies, errors):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        url = random.choice(urls)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(
+                f'GET {url} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: sessionid={session_key}\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            status = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append('connection')
+            writer = None
+            continue
+        if status != 200:
+            errors.append(status)
+        latencies.append(time.perf_counter() - started)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, users, clients, seconds):
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*[
+        client(port, *users[n % len(users)], deadline, latencies, errors) for n in range(clients)
+    ])
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def run(name, path, users, args):
+    port = free_port()
+    server = start_server(name, path, port, args.workers, args.threads)
+    try:
+        asyncio.run(load(port, users, min(args.clients, 50), 2))  # warm up caches and connections
+        latencies, errors = asyncio.run(load(port, users, args.clients, args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    print(
+        f"{name:<9} {len(latencies) / args.seconds:9.1f} req/s "
+        f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  "
+        f"{len(errors):6d} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Server processes.")
+    parser.add_argument('--threads', type=int, default=32, help="Threads per gunicorn worker.")
+    parser.add_argument('--classes', type=int, default=20)
+    parser.add_argument('--class-size', type=int, default=25)
+    parser.add_argument('--lessons', type=int, default=60, help="Lessons per class.")
+    parser.add_argument('--server', choices=SERVERS, action='append')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        users = prepare(path, args.classes, args.class_size, args.lessons)
+        for name in args.server or SERVERS:
+            run(name, path, users, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Concurrent grade-write throughput on SQLite, default profile vs production profile.
+
+Every worker process plays a teacher submitting a whole class's grades at the
+end of a lesson (one bulk upsert transaction) in a loop. Run from the project
+root:
+
+    python benchmarks/sqlite_writes.py --workers 16 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PROFILES = ('development', 'production')
+
+
+def setup_django(profile, path):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'SchoolDiary.settings'
+    os.environ['DJANGO_DB_PROFILE'] = profile
+    os.environ['DJANGO_SQLITE_PATH'] = path
+    import django
+    django.setup()
+
+
+def prepare(profile, path, workers, class_size):
+    setup_django(profile, path)
+    from datetime import date
+
+    from django.core.management import call_command
+
+    from journal.models import Lesson, SchoolClass, Subject
+    from users.models import User
+
+    call_command('migrate', verbosity=0)
+    teacher = User.objects.create(username='teacher')
+    subject = Subject.objects.create(name='Mathematics')
+    for n in range(workers):
+        school_class = SchoolClass.objects.create(name=f'Class {n}')
+        students = User.objects.bulk_create(User(username=f'student{n}-{i}') for i in range(class_size))
+        school_class.student.add(*students)
+        Lesson.objects.create(
+            topic=f'Lesson {n}', subject=subject, school_class=school_class, teacher=teacher, date=date.today()
+        )
+
+
+def work(profile, path, worker, seconds, results):
+    setup_django(profile, path)
+    from django.db import OperationalError, close_old_connections
+
+    from journal.grading import upsert_grades
+    from journal.models import Grade, Lesson
+
+    lesson = Lesson.objects.get(topic=f'Lesson {worker}')
+    student_ids = list(lesson.school_class.student.values_list('id', flat=True))
+    committed = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            upsert_grades(Grade(lesson=lesson, student_id=pk, grade=random.randint(1, 12)) for pk in student_ids)
+            committed += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+        close_old_connections()
+    results.put((committed, locked))
+
+
+def run(profile, args):
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'load.sqlite3')
+        setup = ctx.Process(target=prepare, args=(profile, path, args.workers, args.class_size))
+        setup.start()
+        setup.join()
+
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=work, args=(profile, path, n, args.seconds, results))
+            for n in range(args.workers)
+        ]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    committed = sum(c for c, _ in totals)
+    locked = sum(count for _, count in totals)
+    print(
+        f"{profile:<12} {committed / args.seconds:10.1f} tx/s "
+        f"{committed * args.class_size / args.seconds:10.1f} grades/s "
+        f"{locked:8d} 'database is locked' errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--class-size', type=int, default=30)
+    parser.add_argument('--profile', choices=PROFILES, action='append')
+    args = parser.parse_args()
+    for profile in args.profile or PROFILES:
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
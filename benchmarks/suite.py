@@ -0,0 +1,142 @@
+"""Time every named view in journal.urls and users.urls through the test client."""
+import time
+import tracemalloc
+from statistics import median
+
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from journal import pagecache
+from journal.models import Grade, RevisionCounter
+
+URLCONFS = ('journal.urls', 'users.urls')
+# With seeding.REFERENCE_DATE rather than the calendar's date as the last day,
+# runs on different days build the same number of lessons and grades.
+SCHOOL_DAYS = 20
+
+
+def url_names(urlconfs=URLCONFS):
+    """Names of the views in ``urlconfs``, following includes. Unnamed redirects are skipped."""
+    names = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.append(pattern.name)
+
+    for urlconf in urlconfs:
+        walk(get_resolver(urlconf).url_patterns)
+    return names
+
+
+def cases(school):
+    """Map each url name to ``(user, method, url kwargs, data)``; a user of None is anonymous."""
+    lesson, teacher, student = school.lesson, school.teacher, school.student
+    roster = list(lesson.school_class.student.values_list('id', flat=True))
+    grades = dict(Grade.objects.filter(lesson=lesson).values_list('student_id', 'grade'))
+    bulk = {'form-TOTAL_FORMS': len(roster), 'form-INITIAL_FORMS': len(roster)}
+    for n, student_id in enumerate(roster):
+        bulk[f'form-{n}-student'] = student_id
+        bulk[f'form-{n}-grade'] = grades.get(student_id, 7)
+    lesson_kwargs = {'lesson_id': lesson.id}
+    return {
+        'teacher_dashboard': (teacher, 'get', {}, None),
+        'teacher_lesson_list': (teacher, 'get', {}, None),
+        'teacher_lesson_create': (teacher, 'get', {}, None),
+        'teacher_lesson_detail': (teacher, 'get', lesson_kwargs, None),
+        'bulk_grade': (teacher, 'post', lesson_kwargs, bulk),
+        'set_grade': (teacher, 'get', {**lesson_kwargs, 'student_id': student.id}, None),
+        'gradebook': (teacher, 'get', {'class_id': lesson.school_class_id, 'subject_id': lesson.subject_id}, None),
+        'analytics_report': (teacher, 'get', {}, None),
+        'student_lesson_list': (student, 'get', {}, None),
+        'homework_feed': (student, 'get', {}, None),
+        'lesson_search': (teacher, 'get', {}, {'q': lesson.topic.split()[0]}),
+        'grade_list': (student, 'get', {}, None),
+        'export_grades': (school.staff, 'get', {}, {'school_class': lesson.school_class_id}),
+        'api_teacher_lessons': (teacher, 'get', {}, None),
+        'api_teacher_lesson_detail': (teacher, 'get', lesson_kwargs, None),
+        'api_student_lessons': (student, 'get', {}, None),
+        'api_student_grades': (student, 'get', {}, None),
+        'api_lesson_search': (student, 'get', {}, {'q': lesson.topic.split()[0]}),
+        'api_changes': (school.staff, 'get', {}, {'since': max(RevisionCounter.current() - 500, 0)}),
+        'register': (None, 'get', {}, None),
+        'login': (None, 'get', {}, None),
+        'logout': (None, 'get', {}, None),
+        'home': (student, 'get', {}, None),
+    }
+
+
+def _request(client, method, url, data):
+    # Rendered student pages are cached; measure the view, not the cache.
+    caches[pagecache.PAGE_CACHE].clear()
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    if response.status_code >= 400:
+        raise AssertionError(f"{method.upper()} {url} returned {response.status_code}.")
+    return response
+
+
+def measure(client, method, url, data=None, repeats=5):
+    _request(client, method, url, data)  # warm up role caches and lazy imports
+    times = []
+    for _ in range(repeats):
+        # The query log is a bounded deque; a full one would hide new queries.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            _request(client, method, url, data)
+            times.append(time.perf_counter() - started)
+        # Read now: the next request clears the log the captured queries point into.
+        query_count = len(queries)
+    tracemalloc.start()
+    try:
+        _request(client, method, url, data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'url': url,
+        'method': method.upper(),
+        'wall_ms': {
+            'min': round(min(times) * 1000, 3),
+            'median': round(median(times) * 1000, 3),
+            'max': round(max(times) * 1000, 3),
+        },
+        'queries': query_count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_suite(school, repeats=5, only=None):
+    table = cases(school)
+    missing = set(url_names()) - set(table)
+    if missing:
+        raise LookupError(f"No benchmark case for: {', '.join(sorted(missing))}.")
+    clients = {}
+    results = {}
+    for name, (user, method, kwargs, data) in table.items():
+        if only and name not in only:
+            continue
+        if user not in clients:
+            clients[user] = Client()
+            if user is not None:
+                clients[user].force_login(user)
+        results[name] = measure(clients[user], method, reverse(name, kwargs=kwargs), data, repeats)
+    return results
+
+
+def query_regressions(results, baseline, allowed_growth=0):
+    """Describe every view whose query count grew by more than ``allowed_growth``."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is not None and result['queries'] > before['queries'] + allowed_growth:
+            regressions.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+    return regressions
@@ -1,9 +1,86 @@
-from django.contrib import admin
+import csv
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .importers import GradeImporter, read_rows
+from .models import SchoolClass, Subject, Lesson, Grade, GradeHistory, LessonProgress, StudentSubjectStats
+
+MAX_SHOWN_IMPORT_ERRORS = 100
+
+
+class GradeImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with username, topic, date and grade columns.")
+
+
+@admin.register(Grade)
+class GradeAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/journal/grade/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='journal_grade_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:journal_grade_changelist')
+        errors = []
+        importer = None
+        if request.method == 'POST':
+            form = GradeImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+
+                def on_error(line, row, message):
+                    if len(errors) < MAX_SHOWN_IMPORT_ERRORS:
+                        errors.append((line, message))
+
+                importer = GradeImporter()
+                try:
+                    importer.run(read_rows(upload.file, upload.name), on_error=on_error)
+                except (ImportError, UnicodeDecodeError, csv.Error) as exc:
+                    # Batches before the broken part of the file are already committed.
+                    form.add_error('file', f"{exc} ({importer.imported} grades were imported before it.)")
+                else:
+                    messages.success(request, f"Imported {importer.imported} grades.")
+                    if not importer.failed:
+                        return redirect('admin:journal_grade_changelist')
+        else:
+            form = GradeImportForm()
+        return TemplateResponse(request, 'admin/journal/grade/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import grades",
+            'form': form,
+            'importer': importer,
+            'errors': errors,
+        })
+
+
+@admin.register(GradeHistory)
+class GradeHistoryAdmin(admin.ModelAdmin):
+    list_display = ('changed_at', 'grade_id', 'student_id', 'lesson_id', 'action', 'old_grade', 'new_grade', 'changed_by')
+    list_filter = ('action',)
+    list_select_related = ('changed_by',)
+    search_fields = ('=grade_id', '=student_id', '=lesson_id', 'changed_by__username')
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
-from django.contrib import admin
-from .models import SchoolClass, Subject, Lesson, Grade
 
 admin.site.register(SchoolClass)
 admin.site.register(Subject)
 admin.site.register(Lesson)
-admin.site.register(Grade)
\ No newline at end of file
+admin.site.register(StudentSubjectStats)
+admin.site.register(LessonProgress)
@@ -0,0 +1,155 @@
+"""Term analytics computed with NumPy group-bys over every grade in the term.
+
+The grades are loaded by one ``values_list`` query into a columnar
+structured array; averages, histograms over the 1-12 scale, percentiles
+and weekly trends are then computed without a Python loop per grade.
+NumPy is optional: ``pip install numpy``.
+"""
+from .models import Grade, SchoolClass, Subject
+from .stats import term_bounds
+
+GRADE_SCALE = range(1, 13)
+PERCENTILES = (25, 50, 75, 90)
+COLUMNS = ('student_id', 'lesson_id', 'lesson__subject_id', 'lesson__school_class_id', 'lesson__date', 'grade')
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Term analytics require NumPy: pip install numpy")
+    return numpy
+
+
+def load_grades(term, school_class=None, subject=None):
+    """The term's grades as a structured array with one field per ``COLUMNS`` entry."""
+    np = _numpy()
+    start, end = term_bounds(term)
+    grades = Grade.objects.filter(lesson__date__gte=start, lesson__date__lte=end)
+    if school_class is not None:
+        grades = grades.filter(lesson__school_class=school_class)
+    if subject is not None:
+        grades = grades.filter(lesson__subject=subject)
+    dtype = np.dtype([
+        ('student', 'i8'), ('lesson', 'i8'), ('subject', 'i8'), ('school_class', 'i8'),
+        ('date', 'M8[D]'), ('grade', 'u1'),
+    ])
+    return np.fromiter(grades.values_list(*COLUMNS).order_by().iterator(chunk_size=10000), dtype=dtype)
+
+
+def _groups(np, *keys):
+    """Unique key combinations, sorted, and for every grade the index of its group."""
+    # np.unique(axis=0) sorts rows as opaque bytes and is slow; rank each key
+    # instead and group on one combined integer code.
+    codes = np.zeros(len(keys[0]), dtype='i8')
+    ranked = []
+    for key in keys:
+        values, ranks = np.unique(key, return_inverse=True)
+        codes = codes * len(values) + ranks.reshape(-1)
+        ranked.append(values)
+    groups, inverse = np.unique(codes, return_inverse=True)
+    columns = []
+    for values in reversed(ranked):
+        columns.append(values[groups % len(values)])
+        groups = groups // len(values)
+    return np.stack(columns[::-1], axis=1), inverse.reshape(-1)
+
+
+def _group_stats(np, grades, inverse, size):
+    counts = np.bincount(inverse, minlength=size)
+    means = np.bincount(inverse, weights=grades, minlength=size) / counts
+    # Row i holds the number of each grade 0-12 in group i; grade 0 never occurs.
+    histograms = np.bincount(inverse * 13 + grades, minlength=size * 13).reshape(size, 13)[:, 1:]
+    cumulative = histograms.cumsum(axis=1)
+    # Grades are discrete, so the p-th percentile is the lowest grade reaching p% of the group.
+    percentiles = {
+        percent: (cumulative * 100 < counts[:, None] * percent).sum(axis=1) + 1 for percent in PERCENTILES
+    }
+    return counts, means, histograms, percentiles
+
+
+def _summaries(np, data, *fields):
+    if not len(data):
+        return []
+    unique, inverse = _groups(np, *(data[field] for field in fields))
+    counts, means, histograms, percentiles = _group_stats(np, data['grade'].astype('i8'), inverse, len(unique))
+    return [
+        {
+            **dict(zip(fields, key.tolist())),
+            'count': int(counts[i]),
+            'mean': float(means[i]),
+            'histogram': histograms[i].tolist(),
+            'percentiles': {percent: int(values[i]) for percent, values in percentiles.items()},
+        }
+        for i, key in enumerate(unique)
+    ]
+
+
+def _weekly_trends(np, data):
+    """Mean grade per subject per week (weeks start on Monday) and its change on the week before."""
+    if not len(data):
+        return []
+    # 1970-01-01 was a Thursday; shifting by three days makes weeks start on Monday.
+    days = data['date'].astype('i8')
+    weeks = (days + 3) // 7
+    unique, inverse = _groups(np, data['subject'], weeks)
+    counts = np.bincount(inverse, minlength=len(unique))
+    means = np.bincount(inverse, weights=data['grade'], minlength=len(unique)) / counts
+    # np.unique sorts by subject, then week, so each row follows its subject's previous week.
+    follows = np.zeros(len(unique), dtype=bool)
+    follows[1:] = (unique[1:, 0] == unique[:-1, 0]) & (unique[1:, 1] == unique[:-1, 1] + 1)
+    changes = np.zeros(len(unique))
+    changes[1:] = means[1:] - means[:-1]
+    week_starts = (unique[:, 1] * 7 - 3).astype('M8[D]')
+    return [
+        {
+            'subject': int(subject),
+            'week': week_starts[i].item(),
+            'count': int(counts[i]),
+            'mean': float(means[i]),
+            'change': float(changes[i]) if follows[i] else None,
+        }
+        for i, (subject, _) in enumerate(unique.tolist())
+    ]
+
+
+def _name(names, row, field):
+    row[f'{field}_name'] = names[field].get(row[field], '?')
+    return row
+
+
+def term_report(term, school_class=None, subject=None):
+    """Averages, histograms and percentiles per subject and per class and subject, plus weekly trends."""
+    np = _numpy()
+    data = load_grades(term, school_class, subject)
+    grades = data['grade'].astype('i8')
+    names = {
+        'school_class': dict(SchoolClass.objects.values_list('id', 'name')),
+        'subject': dict(Subject.objects.values_list('id', 'name')),
+    }
+    by_subject = sorted(
+        (_name(names, row, 'subject') for row in _summaries(np, data, 'subject')),
+        key=lambda row: row['subject_name'],
+    )
+    by_class = sorted(
+        (
+            _name(names, _name(names, row, 'school_class'), 'subject')
+            for row in _summaries(np, data, 'school_class', 'subject')
+        ),
+        key=lambda row: (row['school_class_name'], row['subject_name']),
+    )
+    trends = sorted(
+        (_name(names, row, 'subject') for row in _weekly_trends(np, data)),
+        key=lambda row: (row['subject_name'], row['week']),
+    )
+    return {
+        'term': term,
+        'count': len(data),
+        'students': len(np.unique(data['student'])),
+        'lessons': len(np.unique(data['lesson'])),
+        'mean': float(grades.mean()) if len(data) else None,
+        'histogram': np.bincount(grades, minlength=13)[1:].tolist(),
+        'subjects': by_subject,
+        'classes': by_class,
+        'trends': trends,
+    }
@@ -0,0 +1,199 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, F, Max
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from users.models import User
+from users.roles import STUDENTS_GROUP, TEACHERS_GROUP, has_role
+
+from . import pagecache, queries, search, sync
+from .models import Grade, Lesson, RevisionCounter, SchoolClass, Tombstone
+from .pagination import paginate
+
+LESSON_FIELDS = ('id', 'topic', 'date', 'homework')
+LESSON_RELATED = {'subject_name': F('subject__name'), 'class_name': F('school_class__name')}
+
+
+def _freshness(request, func, *args, **kwargs):
+    # ETag and Last-Modified both need it; compute it once per request.
+    if not hasattr(request, '_api_freshness'):
+        request._api_freshness = func(request, *args, **kwargs)
+    return request._api_freshness
+
+
+def api_view(role, freshness):
+    """Guard a read-only JSON view by role and answer conditional GETs.
+
+    ``freshness(request, *args, **kwargs)`` returns ``(state, last_modified)``
+    from a cheap aggregate query; the ETag is a hash of the state and the
+    requested URL, so a matching If-None-Match gets a 304 before the view runs.
+    ``role`` is a role name, a tuple of role names any of which will do, or
+    None to restrict the view to staff.
+    """
+    roles = (role,) if isinstance(role, str) else role
+
+    def etag(request, *args, **kwargs):
+        state, _ = _freshness(request, freshness, *args, **kwargs)
+        key = f'{request.user.pk}:{request.get_full_path()}:{state!r}'
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return _freshness(request, freshness, *args, **kwargs)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @require_GET
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'detail': "Authentication required."}, status=401)
+            if not (request.user.is_staff if roles is None else any(has_role(request.user, r) for r in roles)):
+                return JsonResponse({'detail': "You do not have access to this resource."}, status=403)
+            return conditional_view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def _page_response(request, queryset, ordering, serialize=dict):
+    page = paginate(queryset, request.GET.get('cursor'), ordering=ordering)
+    return JsonResponse({
+        'results': [serialize(item) for item in page.items],
+        'next': page.next_cursor,
+    })
+
+
+def _revision_freshness(queryset):
+    # Any save bumps the revision and any delete the count.
+    state = queryset.aggregate(count=Count('id'), revision=Max('revision'), updated=Max('updated_at'))
+    return (state['count'], state['revision']), state['updated']
+
+
+_lessons_freshness = _grades_freshness = _revision_freshness
+
+
+def _with_deletions(freshness):
+    # The rows' updated_at cannot show a delete; the latest tombstone can.
+    state, last_modified = freshness
+    deleted = Tombstone.objects.order_by('-revision').values_list('deleted_at', flat=True).first()
+    return state, max(filter(None, [last_modified, deleted]), default=None)
+
+
+def _with_names(freshness, *scopes):
+    """Add the page cache versions of ``scopes`` and of class and subject names to ``freshness``.
+
+    Renaming a class, subject or user changes no lesson or grade row, and a
+    roster change shows in a student's version; both alter the responses. So
+    do the edits and deletes of their lessons and grades, which bump it too.
+    """
+    state, last_modified = freshness
+    versions, bumped = pagecache.scope_state(pagecache.GLOBAL_SCOPE, *scopes)
+    return (state, versions), max(filter(None, [last_modified, bumped]), default=None)
+
+
+def _student_scope(request):
+    return pagecache.student_scope(request.user.pk)
+
+
+def _grade_json(row):
+    return {
+        'id': row['id'],
+        'grade': row['grade'],
+        'lesson': {
+            'id': row['lesson_id'],
+            'topic': row['lesson__topic'],
+            'date': row['lesson__date'],
+            'subject_name': row['lesson__subject__name'],
+        },
+    }
+
+
+@api_view(TEACHERS_GROUP, lambda request: _with_names(
+    _with_deletions(_lessons_freshness(Lesson.objects.filter(teacher=request.user))),
+))
+def teacher_lessons(request):
+    lessons = Lesson.objects.filter(teacher=request.user).values(*LESSON_FIELDS, **LESSON_RELATED)
+    return _page_response(request, lessons, queries.LESSON_ORDERING)
+
+
+def _lesson_detail_freshness(request, lesson_id):
+    lesson, lesson_modified = _lessons_freshness(Lesson.objects.filter(pk=lesson_id))
+    grades, grades_modified = _grades_freshness(Grade.objects.filter(lesson_id=lesson_id))
+    roster = SchoolClass.student.through.objects.filter(schoolclass__lessons=lesson_id).aggregate(
+        count=Count('id'), last=Max('id')
+    )
+    last_modified = max(filter(None, [lesson_modified, grades_modified]), default=None)
+    return _with_names(
+        _with_deletions(((lesson, grades, roster['count'], roster['last']), last_modified)), pagecache.USERS_SCOPE,
+    )
+
+
+@api_view(TEACHERS_GROUP, _lesson_detail_freshness)
+def teacher_lesson_detail(request, lesson_id):
+    lesson = Lesson.objects.filter(pk=lesson_id).values(*LESSON_FIELDS, 'school_class_id', **LESSON_RELATED).first()
+    if lesson is None:
+        raise Http404("No such lesson.")
+    grades = dict(Grade.objects.filter(lesson_id=lesson_id).values_list('student_id', 'grade'))
+    students = [
+        {**student, 'grade': grades.get(student['id'])}
+        for student in User.objects.filter(classes=lesson.pop('school_class_id')).order_by(
+            'last_name', 'first_name', 'username'
+        ).values('id', 'username', 'first_name', 'last_name')
+    ]
+    return JsonResponse({'lesson': lesson, 'students': students})
+
+
+@api_view(STUDENTS_GROUP, lambda request: _with_names(
+    _lessons_freshness(Lesson.objects.filter(school_class__student=request.user)), _student_scope(request),
+))
+def student_lessons(request):
+    lessons = Lesson.objects.filter(school_class__student=request.user).values(*LESSON_FIELDS, **LESSON_RELATED)
+    return _page_response(request, lessons, queries.LESSON_ORDERING)
+
+
+@api_view(STUDENTS_GROUP, lambda request: _with_names(
+    _grades_freshness(Grade.objects.filter(student=request.user)), _student_scope(request),
+))
+def student_grades(request):
+    grades = Grade.objects.filter(student=request.user).values(
+        'id', 'grade', 'lesson_id', 'lesson__topic', 'lesson__date', 'lesson__subject__name'
+    )
+    return _page_response(request, grades, queries.GRADE_ORDERING, _grade_json)
+
+
+@api_view(None, lambda request: ((RevisionCounter.current(),), None))
+def changes(request):
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = min(int(request.GET.get('limit', sync.CHANGES_LIMIT)), sync.CHANGES_LIMIT)
+    except ValueError:
+        return JsonResponse({'detail': "'since' and 'limit' must be integers."}, status=400)
+    if since < 0 or limit < 1:
+        return JsonResponse({'detail': "'since' and 'limit' must be positive."}, status=400)
+    return JsonResponse(sync.changes_since(since, limit))
+
+
+def _search_freshness(request):
+    # Any revision can change the matches; a student's also follow their classes.
+    scopes = () if has_role(request.user, TEACHERS_GROUP) else (_student_scope(request),)
+    return _with_names(((RevisionCounter.current(),), None), *scopes)
+
+
+@api_view((TEACHERS_GROUP, STUDENTS_GROUP), _search_freshness)
+def lesson_search(request):
+    """Ranked matches of ``q`` among the user's lessons: their own as a teacher, their classes' as a student."""
+    scope = queries.teacher_lessons if has_role(request.user, TEACHERS_GROUP) else queries.student_lessons
+    results = search.search_lessons(request.GET.get('q', ''), scope(request.user))
+    return JsonResponse({'results': [
+        {
+            'id': lesson.id,
+            'topic': lesson.topic,
+            'date': lesson.date,
+            'homework': lesson.homework,
+            'subject_name': lesson.subject.name,
+            'class_name': lesson.school_class.name,
+        }
+        for lesson in results
+    ]})
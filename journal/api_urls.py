@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('teacher/lessons/', api.teacher_lessons, name='api_teacher_lessons'),
+    path('teacher/lessons/<int:lesson_id>/', api.teacher_lesson_detail, name='api_teacher_lesson_detail'),
+    path('student/lessons/', api.student_lessons, name='api_student_lessons'),
+    path('student/grades/', api.student_grades, name='api_student_grades'),
+    path('lessons/search/', api.lesson_search, name='api_lesson_search'),
+    path('changes/', api.changes, name='api_changes'),
+]
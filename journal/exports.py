@@ -0,0 +1,87 @@
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import Grade
+
+EXPORT_COLUMNS = [
+    'username', 'first_name', 'last_name', 'class', 'subject', 'teacher', 'date', 'topic', 'grade',
+]
+CHUNK_SIZE = 2000
+
+
+def export_queryset(school_class=None, subject=None, teacher=None, date_from=None, date_to=None):
+    """Project every matching grade to a flat tuple in primary key order.
+
+    Ordering by the primary key lets the database stream rows straight off the
+    table instead of sorting the whole result before returning the first one.
+    """
+    grades = Grade.objects.all()
+    if school_class is not None:
+        grades = grades.filter(lesson__school_class=school_class)
+    if subject is not None:
+        grades = grades.filter(lesson__subject=subject)
+    if teacher is not None:
+        grades = grades.filter(lesson__teacher=teacher)
+    if date_from is not None:
+        grades = grades.filter(lesson__date__gte=date_from)
+    if date_to is not None:
+        grades = grades.filter(lesson__date__lte=date_to)
+    return grades.order_by('id').values_list(
+        'student__username', 'student__first_name', 'student__last_name',
+        'lesson__school_class__name', 'lesson__subject__name', 'lesson__teacher__username',
+        'lesson__date', 'lesson__topic', 'grade',
+    )
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield the header and then every row, fetching ``chunk_size`` rows at a time.
+
+    On PostgreSQL ``iterator()`` reads through a server-side cursor.
+    """
+    yield EXPORT_COLUMNS
+    yield from queryset.iterator(chunk_size=chunk_size)
+
+
+async def aexport_rows(queryset, chunk_size=CHUNK_SIZE):
+    """``export_rows`` for an ASGI response, which would otherwise read a sync iterator into a list first."""
+    yield EXPORT_COLUMNS
+    # QuerySet.aiterator() runs a values_list() query in the event loop, so
+    # step the sync iterator in the sync thread instead, a chunk at a time.
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+class Echo:
+    """A file-like object whose ``write`` hands the value straight back."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def acsv_lines(rows):
+    writer = csv.writer(Echo())
+    async for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows, path):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("Exporting .xlsx files requires openpyxl: pip install openpyxl")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Grades')
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
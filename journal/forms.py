@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
-from .models import Lesson, Grade
+from .models import Lesson, Grade, SchoolClass, Subject
 from users.roles import TEACHERS_GROUP, STUDENTS_GROUP
 
 User = get_user_model()
@@ -22,6 +22,29 @@ class LessonForm(forms.ModelForm):
         except Group.DoesNotExist:
             self.fields['teacher'].queryset = User.objects.none()
 
+class LessonFilterForm(forms.Form):
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def filter(self, queryset, field='date'):
+        if not self.is_valid():
+            return queryset
+        if self.cleaned_data['date_from']:
+            queryset = queryset.filter(**{f'{field}__gte': self.cleaned_data['date_from']})
+        if self.cleaned_data['date_to']:
+            queryset = queryset.filter(**{f'{field}__lte': self.cleaned_data['date_to']})
+        return queryset
+
+class GradeExportForm(LessonFilterForm):
+    school_class = forms.ModelChoiceField(queryset=SchoolClass.objects.all(), required=False)
+    subject = forms.ModelChoiceField(queryset=Subject.objects.all(), required=False)
+    teacher = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
+
+class AnalyticsForm(forms.Form):
+    term = forms.RegexField(regex=r'^\d{4}-[12]$', required=False, help_text="e.g. 2025-1 (autumn) or 2025-2 (spring)")
+    school_class = forms.ModelChoiceField(queryset=SchoolClass.objects.all(), required=False)
+    subject = forms.ModelChoiceField(queryset=Subject.objects.all(), required=False)
+
 class GradeForm(forms.ModelForm):
     class Meta:
         model = Grade
@@ -29,4 +52,42 @@ class GradeForm(forms.ModelForm):
         widgets = {
             'student': forms.HiddenInput(),
             'lesson': forms.HiddenInput(),
-        }
\ No newline at end of file
+        }
+
+class BulkGradeForm(forms.Form):
+    student = forms.IntegerField(widget=forms.HiddenInput())
+    grade = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=12,
+        widget=forms.NumberInput(attrs={'min': 1, 'max': 12}),
+    )
+
+
+class BaseBulkGradeFormSet(forms.BaseFormSet):
+
+    def __init__(self, *args, roster=(), **kwargs):
+        self.roster = set(roster)
+        super().__init__(*args, **kwargs)
+
+    def clean(self):
+        if any(self.errors):
+            return
+        seen = set()
+        for form in self.forms:
+            student_id = form.cleaned_data.get('student')
+            if student_id not in self.roster:
+                raise forms.ValidationError("One of the students is not in this class.")
+            if student_id in seen:
+                raise forms.ValidationError("Each student can only be graded once per lesson.")
+            seen.add(student_id)
+
+    def grades(self):
+        return {
+            form.cleaned_data['student']: form.cleaned_data['grade']
+            for form in self.forms
+            if form.cleaned_data.get('grade') is not None
+        }
+
+
+BulkGradeFormSet = forms.formset_factory(BulkGradeForm, formset=BaseBulkGradeFormSet, extra=0)
@@ -0,0 +1,60 @@
+from array import array
+from collections import namedtuple
+
+from users.models import User
+
+from .models import Lesson
+
+# Grades run 1-12, so 0 can mark an empty cell in an unsigned byte.
+NO_GRADE = 0
+
+GradebookLesson = namedtuple('GradebookLesson', ['id', 'date', 'topic'])
+
+
+class Gradebook:
+    """A class's grades in one subject: students as rows, lessons as columns.
+
+    ``grades`` maps each student id to an ``array('B')`` with one byte per
+    lesson, indexed by the lesson's position in ``lessons``.
+    """
+
+    def __init__(self, students, lessons, grades):
+        self.students = students
+        self.lessons = lessons
+        self.grades = grades
+
+    def __iter__(self):
+        """Yield ``(student, grades, average)`` in roster order."""
+        for student in self.students:
+            row = self.grades[student.id]
+            given = [grade for grade in row if grade != NO_GRADE]
+            yield student, row, sum(given) / len(given) if given else None
+
+
+def build_gradebook(school_class, subject, start, end):
+    """Pivot the grades of lessons dated ``start``-``end`` into a Gradebook in two queries."""
+    students = list(
+        User.objects.filter(classes=school_class).only('username').order_by('username', 'id')
+    )
+    # Lessons LEFT JOIN grades: one row per grade, or a single empty row for an ungraded lesson.
+    cells = Lesson.objects.filter(
+        school_class=school_class, subject=subject, date__gte=start, date__lte=end,
+    ).order_by('date', 'id').values_list('id', 'date', 'topic', 'grades__student_id', 'grades__grade')
+
+    lessons = []
+    positions = {}
+    graded = []
+    for lesson_id, day, topic, student_id, grade in cells:
+        if lesson_id not in positions:
+            positions[lesson_id] = len(lessons)
+            lessons.append(GradebookLesson(lesson_id, day, topic))
+        if student_id is not None:
+            graded.append((student_id, positions[lesson_id], grade))
+
+    empty = bytes(len(lessons))
+    grades = {student.id: array('B', empty) for student in students}
+    for student_id, position, grade in graded:
+        # Grades of students who have since left the class are dropped.
+        if student_id in grades:
+            grades[student_id][position] = grade
+    return Gradebook(students, lessons, grades)
@@ -0,0 +1,43 @@
+from django.db import transaction
+
+from . import history, pagecache, progress, stats
+from .models import Grade, RevisionCounter
+
+
+def upsert_grades(grades):
+    """Insert or update ``grades`` in one statement keyed on (student, lesson).
+
+    ``bulk_create`` does not call ``save()`` or send model signals, so callers
+    must validate the values beforehand, and the derived data that the signal
+    handlers maintain is refreshed here instead. Each grade's lesson must be
+    loaded.
+    """
+    grades = list(grades)
+    if not grades:
+        return grades
+    with transaction.atomic():
+        previous = {
+            (student_id, lesson_id): value
+            for student_id, lesson_id, value in Grade.objects.filter(
+                lesson_id__in={grade.lesson_id for grade in grades},
+                student_id__in={grade.student_id for grade in grades},
+            ).values_list('student_id', 'lesson_id', 'grade')
+        }
+        first = RevisionCounter.allocate(len(grades))
+        for revision, grade in enumerate(grades, start=first):
+            grade.revision = revision
+        Grade.objects.bulk_create(
+            grades,
+            update_conflicts=True,
+            unique_fields=['student', 'lesson'],
+            update_fields=['grade', 'updated_at', 'revision'],
+        )
+        stats.refresh_for_grades(grades)
+        # A concurrent upsert may have inserted the same grades since ``previous``
+        # was read, so lessons with new grades are recounted, not incremented.
+        progress.recount_graded(
+            grade.lesson_id for grade in grades if (grade.student_id, grade.lesson_id) not in previous
+        )
+        pagecache.invalidate(grade.student_id for grade in grades)
+        history.grades_upserted(grades, previous)
+    return grades
@@ -0,0 +1,131 @@
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.db import DatabaseError, transaction
+
+from .models import GradeHistory
+
+logger = logging.getLogger(__name__)
+
+# A collector writes its buffer as soon as it holds this many entries, so a
+# request that changes many grades, such as an import, keeps only one batch.
+BUFFER_SIZE = 1000
+
+_collector = ContextVar('grade_history_collector', default=None)
+
+
+class _Collector:
+    # Held in a context variable, which asgiref compares across sync/async
+    # hops; plain identity equality keeps it from evaluating a lazy user.
+
+    def __init__(self, actor):
+        self.actor = actor
+        self.buffer = []
+
+
+@contextmanager
+def collect(actor=None):
+    """Buffer the history entries committed inside the block and write them at its end.
+
+    Entries join the buffer from ``transaction.on_commit``, so changes that
+    are rolled back leave no history. An entry committed outside any block
+    (or after it ended) is written on its own, and a full buffer is written
+    straight away.
+
+    The grades are committed by the time their history is written, so a
+    failed write is logged rather than raised into the response.
+    """
+    collector = _Collector(actor)
+    token = _collector.set(collector)
+    try:
+        yield collector.buffer
+    finally:
+        _collector.reset(token)
+        _write(collector.buffer)
+
+
+@asynccontextmanager
+async def acollect(actor=None):
+    collector = _Collector(actor)
+    token = _collector.set(collector)
+    try:
+        yield collector.buffer
+    finally:
+        _collector.reset(token)
+        if collector.buffer:
+            try:
+                await GradeHistory.objects.abulk_create(collector.buffer)
+            except DatabaseError:
+                logger.exception("Could not write %d grade history entries.", len(collector.buffer))
+            collector.buffer.clear()
+
+
+def _write(entries):
+    if entries:
+        try:
+            GradeHistory.objects.bulk_create(entries)
+        except DatabaseError:
+            logger.exception("Could not write %d grade history entries.", len(entries))
+        entries.clear()
+
+
+def _append(entries, collector):
+    if collector is None or _collector.get() is not collector:
+        _write(entries)
+        return
+    collector.buffer.extend(entries)
+    if len(collector.buffer) >= BUFFER_SIZE:
+        _write(collector.buffer)
+
+
+def _actor_id():
+    collector = _collector.get()
+    actor = collector.actor if collector is not None else None
+    return actor.pk if actor is not None and actor.is_authenticated else None
+
+
+def _entry(grade, action, old_grade, new_grade):
+    return GradeHistory(
+        grade_id=grade.pk,
+        student_id=grade.student_id,
+        lesson_id=grade.lesson_id,
+        action=action,
+        old_grade=old_grade,
+        new_grade=new_grade,
+        changed_by_id=_actor_id(),
+    )
+
+
+def record(entries):
+    entries = list(entries)
+    if entries:
+        collector = _collector.get()
+        # Robust: the change itself has committed, so a failure is only logged.
+        transaction.on_commit(lambda: _append(entries, collector), robust=True)
+
+
+def grade_saved(grade, created):
+    if created:
+        record([_entry(grade, GradeHistory.CREATED, None, grade.grade)])
+        return
+    loaded = getattr(grade, '_loaded_values', {})
+    old = loaded.get('grade')
+    if (old, loaded.get('student_id'), loaded.get('lesson_id')) != (grade.grade, grade.student_id, grade.lesson_id):
+        record([_entry(grade, GradeHistory.UPDATED, old, grade.grade)])
+
+
+def grade_deleted(grade):
+    record([_entry(grade, GradeHistory.DELETED, grade.grade, None)])
+
+
+def grades_upserted(grades, previous):
+    """Record a bulk upsert; ``previous`` maps (student_id, lesson_id) to the old grade."""
+    entries = []
+    for grade in grades:
+        old = previous.get((grade.student_id, grade.lesson_id))
+        if old is None:
+            entries.append(_entry(grade, GradeHistory.CREATED, None, grade.grade))
+        elif old != grade.grade:
+            entries.append(_entry(grade, GradeHistory.UPDATED, old, grade.grade))
+    record(entries)
@@ -0,0 +1,148 @@
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+
+from users.models import User
+from users.roles import STUDENTS_GROUP
+
+from .grading import upsert_grades
+from .models import Grade, Lesson, SchoolClass
+
+IMPORT_COLUMNS = ['username', 'topic', 'date', 'grade']
+ERROR_COLUMNS = ['line'] + IMPORT_COLUMNS + ['error']
+BATCH_SIZE = 2000
+
+
+def read_csv(fileobj):
+    """Yield rows of a UTF-8 CSV file opened in binary mode, one at a time."""
+    yield from csv.DictReader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+
+
+def read_xlsx(fileobj):
+    """Yield rows of the first worksheet without loading the workbook into memory."""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportError("Importing .xlsx files requires openpyxl: pip install openpyxl")
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as exc:
+        # Callers already report ImportError, raised above, as a bad upload.
+        raise ImportError(f"Not a readable .xlsx file: {exc}") from exc
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, name):
+    if name.lower().endswith('.xlsx'):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}.")
+
+
+def _parse_grade(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        value = int(value if isinstance(value, int) else str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid grade {value!r}.")
+    try:
+        Grade._meta.get_field('grade').run_validators(value)
+    except ValidationError as exc:
+        raise ValueError(' '.join(exc.messages))
+    return value
+
+
+class GradeImporter:
+    """Stream (username, topic, date, grade) rows into ``Grade`` in batched upserts.
+
+    Students, lessons and class enrolments are each loaded once into lookup
+    maps, so memory depends on the size of the school, not of the file.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.students = dict(
+            User.objects.filter(groups__name=STUDENTS_GROUP).values_list('username', 'id').iterator()
+        )
+        self.lessons = {
+            topic: Lesson(id=pk, subject_id=subject_id, school_class_id=class_id, date=day)
+            for pk, topic, subject_id, class_id, day in Lesson.objects.values_list(
+                'id', 'topic', 'subject_id', 'school_class_id', 'date'
+            ).iterator()
+        }
+        self.enrolments = set(
+            SchoolClass.student.through.objects.values_list('schoolclass_id', 'user_id').iterator()
+        )
+        self.imported = 0
+        self.failed = 0
+
+    def parse(self, row):
+        username = str(row.get('username') or '').strip()
+        topic = str(row.get('topic') or '').strip()
+        student_id = self.students.get(username)
+        if student_id is None:
+            raise ValueError(f"Unknown student {username!r}.")
+        lesson = self.lessons.get(topic)
+        if lesson is None:
+            raise ValueError(f"Unknown lesson {topic!r}.")
+        if row.get('date') not in (None, '') and _parse_date(row['date']) != lesson.date:
+            raise ValueError(f"Lesson {topic!r} took place on {lesson.date.isoformat()}.")
+        if (lesson.school_class_id, student_id) not in self.enrolments:
+            raise ValueError(f"Student {username!r} is not in the class of lesson {topic!r}.")
+        return Grade(student_id=student_id, lesson=lesson, grade=_parse_grade(row.get('grade')))
+
+    def run(self, rows, on_error=None):
+        """Import ``rows``; ``on_error(line, row, message)`` is called for every rejected row."""
+        batch = {}
+        for line, row in enumerate(rows, start=2):
+            try:
+                grade = self.parse(row)
+            except ValueError as exc:
+                self.failed += 1
+                if on_error is not None:
+                    on_error(line, row, str(exc))
+                continue
+            # A later row for the same student and lesson wins, as it would in the sheet.
+            batch[grade.student_id, grade.lesson.id] = grade
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+        self.flush(batch)
+        return self
+
+    def flush(self, batch):
+        if batch:
+            upsert_grades(batch.values())
+            self.imported += len(batch)
+            batch.clear()
+
+
+class ErrorFile:
+    """Write rejected rows, with their line number and reason, as CSV."""
+
+    def __init__(self, fileobj):
+        self.writer = csv.writer(fileobj)
+        self.writer.writerow(ERROR_COLUMNS)
+
+    def __call__(self, line, row, message):
+        self.writer.writerow([line] + [row.get(column, '') for column in IMPORT_COLUMNS] + [message])
@@ -0,0 +1,75 @@
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from journal import queries
+from journal.models import Grade, Lesson
+from journal.pagination import encode_cursor, page_queryset
+from journal.stats import current_term
+from users.models import User
+
+SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)'),  # SQLite
+    re.compile(r'\bSeq Scan\b'),  # PostgreSQL
+]
+
+
+def hot_paths(teacher, student, lesson):
+    cursor = encode_cursor([date.today(), 0])
+    return [
+        ('teacher_lesson_list', page_queryset(queries.teacher_lessons(teacher), ordering=queries.LESSON_ORDERING)),
+        ('teacher_lesson_list (next page)',
+         page_queryset(queries.teacher_lessons(teacher), cursor, ordering=queries.LESSON_ORDERING)),
+        ('teacher_lesson_list (date range)', page_queryset(
+            queries.teacher_lessons(teacher).filter(date__range=(date(2000, 1, 1), date.today())),
+            ordering=queries.LESSON_ORDERING,
+        )),
+        ('student_lesson_list', page_queryset(queries.student_lessons(student), ordering=queries.LESSON_ORDERING)),
+        ('student_lesson_list (next page)',
+         page_queryset(queries.student_lessons(student), cursor, ordering=queries.LESSON_ORDERING)),
+        ('teacher_lesson_detail', queries.lesson_roster_grades(lesson)),
+        ('student_grade', page_queryset(queries.student_grades(student), ordering=queries.GRADE_ORDERING)),
+        ('student_grade (next page)',
+         page_queryset(queries.student_grades(student), cursor, ordering=queries.GRADE_ORDERING)),
+        ('student_grade (term averages)', queries.student_term_stats(student, current_term())),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of every journal view's hot query and flag full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teacher', type=int, help="Teacher id to plan for (default: any teacher).")
+        parser.add_argument('--student', type=int, help="Student id to plan for (default: any graded student).")
+        parser.add_argument('--lesson', type=int, help="Lesson id to plan for (default: any lesson).")
+        parser.add_argument('--fail-on-scan', action='store_true', help="Exit with an error if a table scan remains.")
+
+    def handle(self, *args, **options):
+        teacher = User(pk=options['teacher'] or (Lesson.objects.values_list('teacher_id', flat=True).first() or 0))
+        student = User(pk=options['student'] or (Grade.objects.values_list('student_id', flat=True).first() or 0))
+        lesson = Lesson.objects.filter(pk=options['lesson']).first() if options['lesson'] else Lesson.objects.first()
+        lesson = lesson or Lesson(pk=0, school_class_id=0)
+
+        scans = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # On small tables PostgreSQL prefers a sequential scan even when an index
+                # fits; disabling it shows whether the index can serve the query at all.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in hot_paths(teacher, student, lesson):
+                plan = queryset.explain()
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(plan)
+                self.stdout.write('')
+                if any(pattern.search(line) for line in plan.splitlines() for pattern in SCAN_PATTERNS):
+                    scans.append(name)
+
+        if not scans:
+            self.stdout.write(self.style.SUCCESS("No table scans."))
+        elif options['fail_on_scan']:
+            raise CommandError(f"Table scans in: {', '.join(scans)}")
+        else:
+            self.stdout.write(self.style.WARNING(f"Table scans in: {', '.join(scans)}"))
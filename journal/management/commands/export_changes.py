@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from journal.sync import CHANGES_LIMIT, changes_since
+
+
+class Command(BaseCommand):
+    help = "Print the lessons, grades and deletions made after a revision as JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help="Last revision already synced (default: 0, everything).")
+        parser.add_argument('--batch-size', type=int, default=CHANGES_LIMIT)
+
+    def handle(self, *args, **options):
+        if options['since'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--since and --batch-size must be positive.")
+        revision = options['since']
+        while True:
+            batch = changes_since(revision, options['batch_size'])
+            for kind in ('lessons', 'grades', 'deleted'):
+                for row in batch[kind]:
+                    self.stdout.write(json.dumps({'type': kind, **row}, cls=DjangoJSONEncoder))
+            revision = batch['revision']
+            if not batch['has_more']:
+                break
+        self.stderr.write(f"Synced up to revision {revision}.")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from journal.exports import csv_lines, export_queryset, export_rows, write_xlsx
+from journal.forms import GradeExportForm
+
+
+class Command(BaseCommand):
+    help = "Stream every grade with its student, lesson, subject and class as CSV or XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write (default: CSV to stdout).")
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help="Defaults to the output file's extension.")
+        parser.add_argument('--class', dest='school_class', help="Class id.")
+        parser.add_argument('--subject', help="Subject id.")
+        parser.add_argument('--teacher', help="Teacher user id.")
+        parser.add_argument('--from', dest='date_from', help="First lesson date (YYYY-MM-DD).")
+        parser.add_argument('--to', dest='date_to', help="Last lesson date (YYYY-MM-DD).")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        form = GradeExportForm({
+            name: options[name]
+            for name in ('school_class', 'subject', 'teacher', 'date_from', 'date_to')
+            if options[name] is not None
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        output = options['output']
+        fmt = options['format'] or ('xlsx' if output and output.endswith('.xlsx') else 'csv')
+        rows = export_rows(export_queryset(**form.cleaned_data), chunk_size=options['chunk_size'])
+
+        if fmt == 'xlsx':
+            if not output:
+                raise CommandError("XLSX exports need --output.")
+            try:
+                write_xlsx(rows, output)
+            except ImportError as exc:
+                raise CommandError(exc)
+            return
+
+        stream = open(output, 'w', newline='', encoding='utf-8') if output else self.stdout
+        try:
+            stream.writelines(csv_lines(rows))
+        finally:
+            if output:
+                stream.close()
@@ -0,0 +1,31 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from journal.importers import BATCH_SIZE, ErrorFile, GradeImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import grades from a CSV or XLSX file with username, topic, date and grade columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--errors', help="Where to write rejected rows (default: <path>.errors.csv).")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        errors_path = options['errors'] or f'{path}.errors.csv'
+        importer = GradeImporter(batch_size=options['batch_size'])
+        try:
+            with open(path, 'rb') as source, open(errors_path, 'w', newline='', encoding='utf-8') as errors:
+                importer.run(read_rows(source, path), on_error=ErrorFile(errors))
+        except (OSError, ImportError, UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {importer.imported} grades."))
+        if not importer.failed:
+            os.remove(errors_path)
+        else:
+            self.stdout.write(self.style.WARNING(f"Rejected {importer.failed} rows, see {errors_path}."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from journal import pagecache
+
+
+class Command(BaseCommand):
+    help = "Report the hit ratio of the cached student pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after reporting.")
+
+    def handle(self, *args, **options):
+        stats = pagecache.stats()
+        ratio = '-' if stats['hit_ratio'] is None else f"{stats['hit_ratio']:.1%}"
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {ratio}")
+        if options['reset']:
+            pagecache.reset_stats()
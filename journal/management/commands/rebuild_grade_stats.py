@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from journal.progress import rebuild_progress
+from journal.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the grade aggregates from scratch: per-student subject stats and per-lesson progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = rebuild_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} stats rows."))
+        lessons = rebuild_progress(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the progress of {lessons} lessons."))
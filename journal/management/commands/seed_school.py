@@ -0,0 +1,50 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from journal.models import Lesson, Subject
+from journal.seeding import BATCH_SIZE, PASSWORD, REFERENCE_DATE, seed_school
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a synthetic school for performance work, e.g. "
+        "seed_school --students 50000 --days 2 for about 160k grades."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--class-size', type=int, default=25)
+        parser.add_argument('--years', type=int, default=1, help="School years of lessons.")
+        parser.add_argument('--days', type=int, help="Only the most recent school days of that span.")
+        parser.add_argument('--today', type=date.fromisoformat, default=REFERENCE_DATE,
+                            help=f"Last day of the span, as YYYY-MM-DD (default: {REFERENCE_DATE}).")
+        parser.add_argument('--lessons-per-day', type=int, default=5, help="Per class.")
+        parser.add_argument('--graded', type=float, default=0.3, help="Share of a class graded in each lesson.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--password', default=PASSWORD, help="Shared by every generated user.")
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['class_size'] < 1 or not 0 < options['graded'] <= 1:
+            raise CommandError("--students and --class-size must be positive and --graded in (0, 1].")
+        if Subject.objects.exists() or Lesson.objects.exists():
+            raise CommandError("The journal already has data; seed_school only fills an empty database.")
+        started = time.perf_counter()
+        school = seed_school(
+            students=options['students'],
+            class_size=options['class_size'],
+            years=options['years'],
+            days=options['days'],
+            today=options['today'],
+            lessons_per_day=options['lessons_per_day'],
+            graded=options['graded'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            password=options['password'],
+        )
+        self.stdout.write(
+            f"Created {school.classes} classes, {school.students} students, {school.lessons} lessons and "
+            f"{school.grades} grades in {time.perf_counter() - started:.1f}s."
+        )
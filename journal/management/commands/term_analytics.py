@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from journal import analytics
+from journal.forms import AnalyticsForm
+from journal.stats import current_term
+
+
+class Command(BaseCommand):
+    help = "Report grade averages, distributions, percentiles and weekly trends for a term (needs NumPy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', help="Term such as 2025-1 (default: the current term).")
+        parser.add_argument('--class', dest='school_class', help="Class id.")
+        parser.add_argument('--subject', help="Subject id.")
+        parser.add_argument('--json', action='store_true', help="Print the whole report as JSON.")
+
+    def handle(self, *args, **options):
+        form = AnalyticsForm({
+            name: options[name] for name in ('term', 'school_class', 'subject') if options[name] is not None
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        try:
+            report = analytics.term_report(
+                form.cleaned_data['term'] or current_term(),
+                form.cleaned_data['school_class'],
+                form.cleaned_data['subject'],
+            )
+        except ImportError as exc:
+            raise CommandError(exc)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, cls=DjangoJSONEncoder, indent=2))
+            return
+
+        mean = '-' if report['mean'] is None else f"{report['mean']:.2f}"
+        self.stdout.write(
+            f"{report['term']}: {report['count']} grades, {report['students']} students, "
+            f"{report['lessons']} lessons, average {mean}"
+        )
+        self.stdout.write("Distribution: " + ' '.join(
+            f'{grade}:{count}' for grade, count in zip(analytics.GRADE_SCALE, report['histogram'])
+        ))
+        percentiles = ' '.join(f'p{percent}' for percent in analytics.PERCENTILES)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Class / subject  grades  average  {percentiles}"))
+        for row in report['classes']:
+            values = ' '.join(str(value) for value in row['percentiles'].values())
+            self.stdout.write(
+                f"{row['school_class_name']} / {row['subject_name']}  {row['count']}  {row['mean']:.2f}  {values}"
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING("Subject  week of  average  change"))
+        for row in report['trends']:
+            change = '-' if row['change'] is None else f"{row['change']:+.2f}"
+            self.stdout.write(f"{row['subject_name']}  {row['week']}  {row['mean']:.2f}  {change}")
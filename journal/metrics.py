@@ -0,0 +1,161 @@
+"""Per-request timings, kept in memory per process for the /ops/metrics page.
+
+Each request records its view, total time, DB time, query count, duplicate
+queries, template render time and response size. A query counts as a
+duplicate when the same SQL already ran in the request with any parameters,
+which is how an N+1 loop shows up.
+"""
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Percentiles are taken over the latest SAMPLE_SIZE requests of each view.
+SAMPLE_SIZE = 1000
+PERCENTILES = (50, 95, 99)
+UNRESOLVED = '<unresolved>'
+
+_current = ContextVar('journal_request_metrics', default=None)
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+_totals = defaultdict(int)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = perf_counter()
+        self.duration = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.template_time = 0.0
+        self._statements = set()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if sql in self._statements:
+            self.duplicates += 1
+        else:
+            self._statements.add(sql)
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {self.duplicates} duplicates"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.duration * 1000:.1f}',
+        ])
+
+
+@contextmanager
+def track():
+    """Collect the queries and template renders of the enclosed code."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.duration = perf_counter() - metrics.started
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper; installed on every connection by ``instrument``."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, perf_counter() - start)
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding each render's time to the current request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+def response_size(response):
+    return None if response.streaming else len(response.content)
+
+
+def record(view, metrics, size):
+    sample = (metrics.duration, metrics.db_time, metrics.queries, metrics.duplicates, metrics.template_time, size)
+    with _lock:
+        _samples[view].append(sample)
+        _totals[view] += 1
+
+
+def _percentile(ordered, percent):
+    # Nearest-rank: the smallest sample with at least ``percent``% of them at or below it.
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[index]
+
+
+def _summary(values):
+    ordered = sorted(values)
+    return {f'p{percent}': _percentile(ordered, percent) for percent in PERCENTILES}
+
+
+def report():
+    """Per-view percentiles, slowest p95 first; times are in milliseconds."""
+    with _lock:
+        snapshot = {view: (list(samples), _totals[view]) for view, samples in _samples.items()}
+    rows = []
+    for view, (samples, total) in snapshot.items():
+        durations, db_times, queries, duplicates, template_times, sizes = zip(*samples)
+        sizes = [size for size in sizes if size is not None]
+        rows.append({
+            'view': view,
+            'requests': total,
+            'total': _summary(duration * 1000 for duration in durations),
+            'db': _summary(db_time * 1000 for db_time in db_times),
+            'template': _summary(template_time * 1000 for template_time in template_times),
+            'queries': _summary(queries),
+            'max_duplicates': max(duplicates),
+            'size': _summary(sizes) if sizes else None,
+        })
+    rows.sort(key=lambda row: row['total']['p95'], reverse=True)
+    return rows
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
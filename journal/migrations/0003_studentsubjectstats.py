@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0002_lesson_teacher_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSubjectStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=6, verbose_name='Term')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Number of grades')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Sum of grades')),
+                ('min_grade', models.PositiveSmallIntegerField(null=True, verbose_name='Lowest grade')),
+                ('max_grade', models.PositiveSmallIntegerField(null=True, verbose_name='Highest grade')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_stats', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_stats', to='journal.subject')),
+            ],
+            options={
+                'verbose_name_plural': 'Student subject stats',
+                'unique_together': {('student', 'term', 'subject')},
+            },
+        ),
+    ]
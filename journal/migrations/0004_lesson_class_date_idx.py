@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_studentsubjectstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['school_class', '-date', '-id'], name='lesson_class_date_idx'),
+        ),
+    ]
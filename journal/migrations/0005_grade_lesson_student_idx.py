@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_lesson_class_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='grade',
+            name='lesson',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='journal.lesson'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['lesson', 'student', 'grade'], name='grade_lesson_student_idx'),
+        ),
+    ]
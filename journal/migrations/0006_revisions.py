@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def backfill_revisions(apps, schema_editor):
+    # Existing rows get revisions derived from their ids, so a sync starting
+    # from revision 0 picks them all up.
+    Lesson = apps.get_model('journal', 'Lesson')
+    Grade = apps.get_model('journal', 'Grade')
+    RevisionCounter = apps.get_model('journal', 'RevisionCounter')
+    lessons = Lesson.objects.aggregate(last=Max('id'))['last'] or 0
+    grades = Grade.objects.aggregate(last=Max('id'))['last'] or 0
+    Lesson.objects.update(revision=F('id'))
+    Grade.objects.update(revision=F('id') + lessons, updated_at=F('created_at'))
+    RevisionCounter.objects.create(pk=1, value=lessons + grades)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0005_grade_lesson_student_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevisionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('lesson', 'Lesson'), ('grade', 'Grade')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('revision', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_revisions, migrations.RunPython.noop),
+    ]
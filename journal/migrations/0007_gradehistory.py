@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0006_revisions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade_id', models.BigIntegerField(verbose_name='Grade')),
+                ('student_id', models.BigIntegerField(verbose_name='Student')),
+                ('lesson_id', models.BigIntegerField(verbose_name='Lesson')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=7)),
+                ('old_grade', models.PositiveSmallIntegerField(null=True, verbose_name='Old grade')),
+                ('new_grade', models.PositiveSmallIntegerField(null=True, verbose_name='New grade')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grade_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Grade history',
+                'indexes': [models.Index(fields=['grade_id', 'changed_at'], name='grade_history_grade_idx'), models.Index(fields=['changed_by', 'changed_at'], name='grade_history_teacher_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_progress(apps, schema_editor):
+    Lesson = apps.get_model('journal', 'Lesson')
+    Grade = apps.get_model('journal', 'Grade')
+    SchoolClass = apps.get_model('journal', 'SchoolClass')
+    LessonProgress = apps.get_model('journal', 'LessonProgress')
+    rosters = dict(
+        SchoolClass.student.through.objects.values_list('schoolclass_id').annotate(Count('id')).order_by()
+    )
+    graded = dict(Grade.objects.values_list('lesson_id').annotate(Count('id')).order_by())
+    LessonProgress.objects.bulk_create(
+        (
+            LessonProgress(lesson_id=lesson_id, graded=graded.get(lesson_id, 0), roster=rosters.get(class_id, 0))
+            for lesson_id, class_id in Lesson.objects.values_list('id', 'school_class_id').iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0007_gradehistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonProgress',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='journal.lesson')),
+                ('graded', models.PositiveIntegerField(default=0, verbose_name='Graded students')),
+                ('roster', models.PositiveIntegerField(default=0, verbose_name='Students in class')),
+            ],
+            options={
+                'verbose_name_plural': 'Lesson progress',
+            },
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table over journal_lesson, kept in sync
+# by triggers. Django rebuilds a SQLite table to alter it, which drops its
+# triggers; journal.search.restore_triggers recreates them after migrate.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE journal_lesson_fts USING fts5("
+    "topic, homework, content='journal_lesson', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER journal_lesson_fts_insert AFTER INSERT ON journal_lesson BEGIN "
+    "INSERT INTO journal_lesson_fts(rowid, topic, homework) VALUES (new.id, new.topic, new.homework); END",
+    "CREATE TRIGGER journal_lesson_fts_delete AFTER DELETE ON journal_lesson BEGIN "
+    "INSERT INTO journal_lesson_fts(journal_lesson_fts, rowid, topic, homework) "
+    "VALUES ('delete', old.id, old.topic, old.homework); END",
+    "CREATE TRIGGER journal_lesson_fts_update AFTER UPDATE OF topic, homework ON journal_lesson BEGIN "
+    "INSERT INTO journal_lesson_fts(journal_lesson_fts, rowid, topic, homework) "
+    "VALUES ('delete', old.id, old.topic, old.homework); "
+    "INSERT INTO journal_lesson_fts(rowid, topic, homework) VALUES (new.id, new.topic, new.homework); END",
+    "INSERT INTO journal_lesson_fts(journal_lesson_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER journal_lesson_fts_update",
+    "DROP TRIGGER journal_lesson_fts_delete",
+    "DROP TRIGGER journal_lesson_fts_insert",
+    "DROP TABLE journal_lesson_fts",
+]
+
+# PostgreSQL: a generated tsvector column, topic weighted above homework, with a GIN index.
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE journal_lesson ADD COLUMN search tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', topic), 'A') || setweight(to_tsvector('simple', homework), 'B')) STORED",
+    "CREATE INDEX journal_lesson_search_idx ON journal_lesson USING GIN (search)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX journal_lesson_search_idx",
+    "ALTER TABLE journal_lesson DROP COLUMN search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0008_lessonprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0010_pageversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageversion',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
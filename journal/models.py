@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 
 class SchoolClass(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Class name")
@@ -18,7 +19,58 @@ class Subject(models.Model):
     def __str__(self):
         return self.name
 
-class Lesson(models.Model):
+class RevisionCounter(models.Model):
+    """The single row holding the last revision handed out to a Lesson or Grade."""
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count=1):
+        """Reserve ``count`` consecutive revisions and return the first one.
+
+        Must run inside the transaction that writes them: the counter row stays
+        locked until it commits, so revisions become visible in order and a
+        reader never sees revision N before every revision below it.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(value=models.F('value') + count):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(value=models.F('value') + count)
+            return cls.objects.values_list('value', flat=True).get(pk=1) - count + 1
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+class Revisioned(models.Model):
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    revision = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *, force_insert=False, force_update=False, using=None, update_fields=None):
+        if update_fields is not None:
+            update_fields = {*update_fields, 'updated_at', 'revision'}
+        with transaction.atomic(using=using):
+            self.revision = RevisionCounter.allocate()
+            super().save(force_insert=force_insert, force_update=force_update, using=using,
+                         update_fields=update_fields)
+
+
+class Tombstone(models.Model):
+    """Records a deleted Lesson or Grade so incremental syncs can drop it too."""
+    MODELS = [('lesson', "Lesson"), ('grade', "Grade")]
+
+    model = models.CharField(max_length=10, choices=MODELS)
+    object_id = models.BigIntegerField()
+    revision = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} (revision {self.revision})"
+
+class Lesson(Revisioned):
     topic = models.CharField(max_length=100, unique=True, verbose_name="Lesson topic")
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='lessons')
     school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='lessons')
@@ -30,16 +82,28 @@ class Lesson(models.Model):
     homework = models.TextField(blank=True, verbose_name="Lesson topicHomework")
     date = models.DateField(verbose_name="Date and time of the lesson")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', '-date', '-id'], name='lesson_teacher_date_idx'),
+            models.Index(fields=['school_class', '-date', '-id'], name='lesson_class_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"{self.topic} - {self.subject.name} ({self.date.strftime('%Y-%m-%d')})"
 
-class Grade(models.Model):
+class Grade(Revisioned):
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='grades'
     )
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='grades')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='grades', db_index=False)
     grade = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(12)],
         verbose_name="Grade value"
@@ -48,6 +112,108 @@ class Grade(models.Model):
 
     class Meta:
         unique_together = ('student', 'lesson')
+        indexes = [
+            # Leads with lesson, so it also replaces the plain lesson_id FK index.
+            models.Index(fields=['lesson', 'student', 'grade'], name='grade_lesson_student_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def __str__(self):
+        return f"{self.student.username} - {self.lesson.topic}: {self.grade}"
+
+class GradeHistory(models.Model):
+    """One change to a grade. Rows are only ever added, never edited.
+
+    Grade, student and lesson are plain ids so the history outlives them.
+    """
+    CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+    ACTIONS = [(CREATED, "Created"), (UPDATED, "Updated"), (DELETED, "Deleted")]
+
+    grade_id = models.BigIntegerField(verbose_name="Grade")
+    student_id = models.BigIntegerField(verbose_name="Student")
+    lesson_id = models.BigIntegerField(verbose_name="Lesson")
+    action = models.CharField(max_length=7, choices=ACTIONS)
+    old_grade = models.PositiveSmallIntegerField(null=True, verbose_name="Old grade")
+    new_grade = models.PositiveSmallIntegerField(null=True, verbose_name="New grade")
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='grade_changes',
+        db_index=False
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Grade history"
+        indexes = [
+            models.Index(fields=['grade_id', 'changed_at'], name='grade_history_grade_idx'),
+            # Also serves as the changed_by FK index.
+            models.Index(fields=['changed_by', 'changed_at'], name='grade_history_teacher_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Grade history is append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Grade {self.grade_id} {self.action}: {self.old_grade} -> {self.new_grade}"
+
+class StudentSubjectStats(models.Model):
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='subject_stats'
+    )
+    term = models.CharField(max_length=6, verbose_name="Term")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='student_stats')
+    count = models.PositiveIntegerField(default=0, verbose_name="Number of grades")
+    total = models.PositiveIntegerField(default=0, verbose_name="Sum of grades")
+    min_grade = models.PositiveSmallIntegerField(null=True, verbose_name="Lowest grade")
+    max_grade = models.PositiveSmallIntegerField(null=True, verbose_name="Highest grade")
+
+    class Meta:
+        unique_together = ('student', 'term', 'subject')
+        verbose_name_plural = "Student subject stats"
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.student.username} - {self.subject.name} ({self.term})"
+
+class PageVersion(models.Model):
+    """The version of one scope of cached student pages (see ``journal.pagecache``).
+
+    Kept in the database so that every process sees a bump as soon as it commits.
+    """
+    scope = models.CharField(max_length=40, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
+
+class LessonProgress(models.Model):
+    """How many students of the lesson's class are graded, kept up to date as grades and rosters change."""
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, primary_key=True, related_name='progress')
+    graded = models.PositiveIntegerField(default=0, verbose_name="Graded students")
+    roster = models.PositiveIntegerField(default=0, verbose_name="Students in class")
+
+    class Meta:
+        verbose_name_plural = "Lesson progress"
+
+    @property
+    def ungraded(self):
+        # Grades of students who have left the class still count as graded.
+        return max(self.roster - self.graded, 0)
 
     def __str__(self):
-        return f"{self.student.username} - {self.lesson.topic}: {self.grade}"
\ No newline at end of file
+        return f"{self.lesson.topic}: {self.graded}/{self.roster}"
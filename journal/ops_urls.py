@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('metrics/', views.ops_metrics, name='ops_metrics'),
+]
@@ -0,0 +1,152 @@
+import hashlib
+
+from django.core.cache import caches
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import PageVersion
+
+PAGE_CACHE = 'pages'
+PAGE_TIMEOUT = 24 * 60 * 60
+GLOBAL_SCOPE = 'global'
+# Not used by pages: bumped when a user is renamed, for the API's conditional responses.
+USERS_SCOPE = 'users'
+
+
+def _cache():
+    return caches[PAGE_CACHE]
+
+
+# The versions live in the database, not in the cache, which may be per
+# process: a bump committed by any worker or management command changes the
+# fragment keys every process uses.
+
+def _versions(*scopes):
+    versions = dict(PageVersion.objects.filter(scope__in=scopes).values_list('scope', 'version'))
+    return [versions.get(scope, 0) for scope in scopes]
+
+
+async def _aversions(*scopes):
+    versions = {scope: version async for scope, version in
+                PageVersion.objects.filter(scope__in=scopes).values_list('scope', 'version')}
+    return [versions.get(scope, 0) for scope in scopes]
+
+
+def scope_state(*scopes):
+    """The versions of ``scopes`` and when the latest of them was bumped, for conditional responses."""
+    rows = {scope: (version, bumped) for scope, version, bumped in
+            PageVersion.objects.filter(scope__in=scopes).values_list('scope', 'version', 'updated_at')}
+    return (
+        tuple(rows[scope][0] if scope in rows else 0 for scope in scopes),
+        max((bumped for _, bumped in rows.values()), default=None),
+    )
+
+
+def student_scope(student_id):
+    return f'student:{student_id}'
+
+
+def _bump(scopes):
+    # One upsert for every scope, in a fixed order so that concurrent bumps cannot deadlock.
+    qn = connection.ops.quote_name
+    table = qn(PageVersion._meta.db_table)
+    version, updated_at = qn('version'), qn('updated_at')
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('scope')}, {version}, {updated_at}) "
+            f"VALUES {', '.join(['(%s, 1, %s)'] * len(scopes))} "
+            f"ON CONFLICT ({qn('scope')}) DO UPDATE SET "
+            f"{version} = {table}.{version} + 1, {updated_at} = excluded.{updated_at}",
+            [value for scope in sorted(scopes) for value in (scope, now)],
+        )
+
+
+def bump(*scopes):
+    if scopes:
+        _bump(set(scopes))
+
+
+def invalidate(student_ids=(), everyone=False):
+    """Expire the cached pages of ``student_ids`` (or of every student).
+
+    The bump is part of the current transaction, so it becomes visible together
+    with the change that caused it; a page rendered from the old data in the
+    meantime is stored under the old version and never reused.
+    """
+    scopes = {GLOBAL_SCOPE} if everyone else {student_scope(pk) for pk in student_ids}
+    if scopes:
+        _bump(scopes)
+
+
+def _count(outcome):
+    cache = _cache()
+    key = f'journal:pages:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+async def _acount(outcome):
+    cache = _cache()
+    key = f'journal:pages:{outcome}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, None)
+
+
+def stats():
+    counts = _cache().get_many(['journal:pages:hits', 'journal:pages:misses'])
+    hits = counts.get('journal:pages:hits', 0)
+    misses = counts.get('journal:pages:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else None}
+
+
+def reset_stats():
+    _cache().delete_many(['journal:pages:hits', 'journal:pages:misses'])
+
+
+def student_fragment(request, name, template, get_context, *extra_key):
+    """Render ``template`` for the current student, or reuse the cached rendering.
+
+    ``get_context`` is only called on a miss. Versions are read before any
+    data so a concurrent edit can only make the stored fragment unreachable.
+    The cached fragments and hit counts may be per process; the versions are not.
+    """
+    versions = _versions(GLOBAL_SCOPE, student_scope(request.user.pk))
+    key = _fragment_key(request, name, versions, extra_key)
+    cache = _cache()
+    html = cache.get(key)
+    if html is not None:
+        _count('hits')
+        return mark_safe(html)
+    _count('misses')
+    html = render_to_string(template, get_context(), request)
+    cache.set(key, str(html), PAGE_TIMEOUT)
+    return html
+
+
+async def astudent_fragment(request, name, template, aget_context, *extra_key):
+    """Async ``student_fragment``; ``aget_context`` is a coroutine function whose
+    context must not load anything lazily while the template renders."""
+    versions = await _aversions(GLOBAL_SCOPE, student_scope(request.user.pk))
+    key = _fragment_key(request, name, versions, extra_key)
+    cache = _cache()
+    html = await cache.aget(key)
+    if html is not None:
+        await _acount('hits')
+        return mark_safe(html)
+    await _acount('misses')
+    html = render_to_string(template, await aget_context(), request)
+    await cache.aset(key, str(html), PAGE_TIMEOUT)
+    return html
+
+
+def _fragment_key(request, name, versions, extra_key):
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    return ':'.join(['journal:pages', name, str(request.user.pk), *map(str, versions), query, *map(str, extra_key)])
@@ -0,0 +1,111 @@
+import base64
+import json
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+class KeysetPage:
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise BadRequest("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise BadRequest("Invalid cursor.")
+    return values
+
+
+def _value(item, name):
+    if isinstance(item, dict):
+        return item[name]
+    for attr in name.split('__'):
+        item = getattr(item, attr)
+    return item
+
+
+def _field(model, name):
+    *relations, last = name.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(last)
+
+
+def _cursor_values(model, ordering, values):
+    """Convert decoded cursor values to the types of their ordering fields; a tampered cursor is a bad request."""
+    converted = []
+    for field, value in zip(ordering, values):
+        model_field = _field(model, field.lstrip('-'))
+        try:
+            value = model_field.to_python(value)
+            model_field.run_validators(value)
+        except (ValidationError, TypeError, ValueError):
+            raise BadRequest("Invalid cursor.")
+        if value is None:
+            raise BadRequest("Invalid cursor.")
+        converted.append(value)
+    return converted
+
+
+def _after(ordering, values):
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def page_queryset(queryset, cursor=None, ordering=('-date', '-id'), page_size=PAGE_SIZE):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = _cursor_values(queryset.model, ordering, decode_cursor(cursor, len(ordering)))
+        queryset = queryset.filter(_after(ordering, values))
+    return queryset[:page_size + 1]
+
+
+def paginate(queryset, cursor=None, ordering=('-date', '-id'), page_size=PAGE_SIZE):
+    """Return one page of ``queryset`` seeking past ``cursor`` instead of using OFFSET.
+
+    ``ordering`` must end in a unique field so that every row has a distinct
+    position; the cursor is an opaque encoding of the last row's sort values.
+    """
+    return _page(list(page_queryset(queryset, cursor, ordering, page_size)), ordering, page_size)
+
+
+async def apaginate(queryset, cursor=None, ordering=('-date', '-id'), page_size=PAGE_SIZE):
+    items = [item async for item in page_queryset(queryset, cursor, ordering, page_size)]
+    return _page(items, ordering, page_size)
+
+
+def _page(items, ordering, page_size):
+    if len(items) <= page_size:
+        return KeysetPage(items)
+    items = items[:page_size]
+    return KeysetPage(items, encode_cursor([_value(items[-1], field.lstrip('-')) for field in ordering]))
@@ -0,0 +1,93 @@
+"""Per-lesson grading progress: graded students against the size of the class.
+
+The counters are adjusted by the signal handlers and ``upsert_grades`` as
+grades and rosters change, so the teacher dashboard reads them instead of
+counting grades per lesson.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Grade, Lesson, LessonProgress, SchoolClass
+
+
+def class_size(class_id):
+    return SchoolClass.student.through.objects.filter(schoolclass_id=class_id).count()
+
+
+def lesson_created(lesson):
+    LessonProgress.objects.create(lesson=lesson, roster=class_size(lesson.school_class_id))
+
+
+def lesson_moved(lesson):
+    """Recount the roster of a lesson that now belongs to another class."""
+    LessonProgress.objects.filter(lesson=lesson).update(roster=class_size(lesson.school_class_id))
+
+
+def add_graded(lesson_ids, sign=1):
+    """Count one more (or with ``sign=-1`` one fewer) graded student for each lesson id, repeats included.
+
+    Lessons without a progress row, e.g. from ``bulk_create``, are recounted
+    instead; a removed grade leaves them alone.
+    """
+    counts = Counter(lesson_ids)
+    if not counts:
+        return
+    updated = LessonProgress.objects.filter(lesson_id__in=counts).update(graded=F('graded') + sign * Case(
+        *[When(lesson_id=lesson_id, then=Value(count)) for lesson_id, count in counts.items()],
+        output_field=IntegerField(),
+    ))
+    if sign > 0 and updated < len(counts):
+        with transaction.atomic():
+            recount_graded(counts)
+
+
+def recount_graded(lesson_ids):
+    """Count the graded students of each lesson afresh, creating missing progress rows.
+
+    Must run in a transaction. The rows are locked before the count, so under
+    READ COMMITTED it sees the grades of any concurrent writer of the same
+    lessons, which has committed by then.
+    """
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return
+    existing = set(LessonProgress.objects.select_for_update().filter(
+        lesson_id__in=lesson_ids
+    ).values_list('lesson_id', flat=True))
+    if missing := lesson_ids - existing:
+        sizes = {}
+        LessonProgress.objects.bulk_create([
+            LessonProgress(
+                lesson_id=lesson_id,
+                roster=sizes[class_id] if class_id in sizes else sizes.setdefault(class_id, class_size(class_id)),
+            )
+            for lesson_id, class_id in Lesson.objects.filter(pk__in=missing).values_list('id', 'school_class_id')
+        ], ignore_conflicts=True)
+    LessonProgress.objects.filter(lesson_id__in=lesson_ids).update(graded=Coalesce(
+        Subquery(Grade.objects.filter(lesson_id=OuterRef('lesson_id')).order_by().values('lesson_id').annotate(
+            count=Count('id')
+        ).values('count')),
+        0,
+    ))
+
+
+def refresh_rosters(class_ids):
+    """Copy the current size of each class in ``class_ids`` to all of its lessons."""
+    for class_id in set(class_ids):
+        LessonProgress.objects.filter(lesson__school_class_id=class_id).update(roster=class_size(class_id))
+
+
+def rebuild_progress(batch_size=2000):
+    rosters = dict(SchoolClass.objects.values_list('id').annotate(Count('student')).order_by())
+    graded = dict(Grade.objects.values_list('lesson_id').annotate(Count('id')).order_by())
+    progress = [
+        LessonProgress(lesson_id=lesson_id, graded=graded.get(lesson_id, 0), roster=rosters[class_id])
+        for lesson_id, class_id in Lesson.objects.values_list('id', 'school_class_id').iterator()
+    ]
+    with transaction.atomic():
+        LessonProgress.objects.all().delete()
+        LessonProgress.objects.bulk_create(progress, batch_size=batch_size)
+    return len(progress)
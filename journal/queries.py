@@ -0,0 +1,81 @@
+from django.db.models import F, FilteredRelation, Q
+
+from users.models import User
+
+from .models import Grade, GradeHistory, Lesson, StudentSubjectStats
+
+LESSON_ORDERING = ('-date', '-id')
+GRADE_ORDERING = ('-lesson__date', '-id')
+GROUPED_GRADE_ORDERING = ('lesson__subject__name', '-lesson__date', '-id')
+
+
+def teacher_lessons(teacher):
+    return Lesson.objects.filter(teacher=teacher).select_related('subject', 'school_class')
+
+
+def teacher_upcoming_lessons(teacher, today):
+    return teacher_lessons(teacher).filter(date__gte=today).order_by('date', 'id')
+
+
+def teacher_lessons_to_grade(teacher, today):
+    """Past lessons of ``teacher`` with students still ungraded, latest first; reads LessonProgress."""
+    return teacher_lessons(teacher).filter(
+        date__lte=today, progress__graded__lt=F('progress__roster'),
+    ).select_related('progress').order_by(*LESSON_ORDERING)
+
+
+def student_lessons(student):
+    return Lesson.objects.filter(school_class__student=student).select_related('subject', 'school_class')
+
+
+def student_homework(student, start, end):
+    return student_lessons(student).filter(date__gte=start, date__lte=end).exclude(homework='').order_by(
+        'date', 'subject__name', 'id'
+    )
+
+
+def lesson_details():
+    return Lesson.objects.select_related('subject', 'school_class')
+
+
+def lesson_roster(lesson):
+    return User.objects.filter(classes=lesson.school_class_id)
+
+
+def lesson_roster_grades(lesson):
+    """The class roster by name, each student's grade for ``lesson`` (or None) in ``lesson_grade``.
+
+    One query however large the class: the grades are LEFT JOINed onto the roster.
+    """
+    return lesson_roster(lesson).annotate(
+        lesson_grade=FilteredRelation('grades', condition=Q(grades__lesson=lesson)),
+    ).select_related('lesson_grade').order_by('username', 'id')
+
+
+def student_grades(student):
+    return Grade.objects.filter(student=student).select_related(
+        'lesson__subject', 'lesson__school_class'
+    ).only(
+        'grade', 'lesson__date', 'lesson__topic', 'lesson__subject__name', 'lesson__school_class__name'
+    )
+
+
+def student_term_stats(student, term):
+    return StudentSubjectStats.objects.filter(
+        student=student, term=term
+    ).select_related('subject').order_by('subject__name')
+
+
+def grade_history(grade_id):
+    return GradeHistory.objects.filter(grade_id=grade_id).order_by('changed_at', 'id')
+
+
+def teacher_changes(teacher, start, end):
+    """Grade changes made by ``teacher`` with ``start <= changed_at < end``."""
+    return GradeHistory.objects.filter(
+        changed_by=teacher, changed_at__gte=start, changed_at__lt=end
+    ).order_by('changed_at', 'id')
+
+
+def grades_entered(teacher, since):
+    return GradeHistory.objects.filter(changed_by=teacher, action=GradeHistory.CREATED, changed_at__gte=since)
@@ -0,0 +1,110 @@
+"""Ranked full-text search over lesson topics and homework.
+
+Served at /journal/search/ and, as JSON, at /journal/api/v1/lessons/search/.
+
+Migration 0009 builds the index: an FTS5 table kept up to date by triggers
+on SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+Topic matches rank above homework matches. Django rebuilds a SQLite table to
+alter it, which drops its triggers, so ``restore_triggers`` runs after every
+migrate.
+"""
+import re
+
+from django.db import connection, connections
+
+from .models import Lesson
+
+SEARCH_LIMIT = 20
+MAX_TERMS = 8
+# The last term also matches as a prefix once it is this long.
+MIN_PREFIX = 3
+
+# As created by migration 0009.
+SQLITE_TRIGGERS = {
+    'journal_lesson_fts_insert': (
+        "CREATE TRIGGER journal_lesson_fts_insert AFTER INSERT ON journal_lesson BEGIN "
+        "INSERT INTO journal_lesson_fts(rowid, topic, homework) VALUES (new.id, new.topic, new.homework); END"
+    ),
+    'journal_lesson_fts_delete': (
+        "CREATE TRIGGER journal_lesson_fts_delete AFTER DELETE ON journal_lesson BEGIN "
+        "INSERT INTO journal_lesson_fts(journal_lesson_fts, rowid, topic, homework) "
+        "VALUES ('delete', old.id, old.topic, old.homework); END"
+    ),
+    'journal_lesson_fts_update': (
+        "CREATE TRIGGER journal_lesson_fts_update AFTER UPDATE OF topic, homework ON journal_lesson BEGIN "
+        "INSERT INTO journal_lesson_fts(journal_lesson_fts, rowid, topic, homework) "
+        "VALUES ('delete', old.id, old.topic, old.homework); "
+        "INSERT INTO journal_lesson_fts(rowid, topic, homework) VALUES (new.id, new.topic, new.homework); END"
+    ),
+}
+
+SEARCH_SQL = {
+    # bm25() is lower for better matches; the weights are per column (topic, homework).
+    # The scope filters the joined lesson: put on the FTS table's rowid instead,
+    # it is rechecked against every match, which takes seconds for common words.
+    'sqlite': (
+        "SELECT lesson.id, bm25(journal_lesson_fts, 4.0, 1.0) AS rank FROM journal_lesson_fts "
+        "JOIN journal_lesson lesson ON lesson.id = journal_lesson_fts.rowid "
+        "WHERE journal_lesson_fts MATCH %s AND lesson.id IN ({scope}) ORDER BY rank LIMIT %s"
+    ),
+    'postgresql': (
+        "SELECT id, -ts_rank(search, query) AS rank FROM journal_lesson, to_tsquery('simple', %s) query "
+        "WHERE search @@ query AND id IN ({scope}) ORDER BY rank LIMIT %s"
+    ),
+}
+
+
+def restore_triggers(using='default'):
+    """Recreate the SQLite index triggers a table rebuild dropped and reindex; return their names."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return []
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'journal_lesson_fts%'")
+        existing = {name for name, in cursor.fetchall()}
+        if 'journal_lesson_fts' not in existing:  # migration 0009 not applied
+            return []
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            # Changes made without the triggers are missing from the index.
+            cursor.execute("INSERT INTO journal_lesson_fts(journal_lesson_fts) VALUES ('rebuild')")
+    return missing
+
+
+def search_terms(query):
+    """The words of ``query``, lowercased; anything else, search operators included, is dropped."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _match(terms):
+    prefix = len(terms[-1]) >= MIN_PREFIX
+    if connection.vendor == 'postgresql':
+        return ' & '.join(terms) + (':*' if prefix else '')
+    return ' '.join(f'"{term}"' for term in terms) + ('*' if prefix else '')
+
+
+def search_lessons(query, scope, limit=SEARCH_LIMIT):
+    """Lessons of the ``scope`` queryset whose topic or homework match every word of ``query``, best first.
+
+    Each lesson gets its subject and class loaded and a ``search_rank``
+    (lower is better). Costs two queries.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    scope_sql, scope_params = scope.order_by().values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SEARCH_SQL[connection.vendor].format(scope=scope_sql),
+            [_match(terms), *scope_params, limit],
+        )
+        ranks = dict(cursor.fetchall())
+    lessons = Lesson.objects.select_related('subject', 'school_class').in_bulk(ranks)
+    results = []
+    for lesson_id, rank in ranks.items():
+        if lesson_id in lessons:  # unless deleted in between
+            lessons[lesson_id].search_rank = rank
+            results.append(lessons[lesson_id])
+    return results
@@ -0,0 +1,159 @@
+"""Synthetic school data for performance work: classes, students, lessons and grades.
+
+Rows are written in batches without signals, and every user shares one
+password hash. Users, classes and lessons go through ``bulk_create`` for
+their ids; the bulk tables (roster and group through tables, grades, their
+stats and the lessons' progress) skip model instances and use ``executemany``.
+"""
+import random
+from datetime import date, timedelta
+from itertools import islice
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.utils import timezone
+
+from users.models import User
+from users.roles import STUDENTS_GROUP, TEACHERS_GROUP
+
+from .models import Grade, Lesson, LessonProgress, RevisionCounter, SchoolClass, StudentSubjectStats, Subject
+from .stats import _fold
+
+SUBJECTS = ['Mathematics', 'Literature', 'History', 'Physics', 'Chemistry', 'Biology', 'English', 'Geography']
+PASSWORD = 'schooldiary'
+BATCH_SIZE = 2000
+# The last school day seeded unless told otherwise, so a seed can be reproduced.
+REFERENCE_DATE = date(2025, 5, 30)
+
+
+def _bulk_create(model, objects, batch_size=BATCH_SIZE):
+    objects = iter(objects)
+    created = []
+    while batch := list(islice(objects, batch_size)):
+        created += model.objects.bulk_create(batch)
+    return created
+
+
+def _insert(model, fields, rows, batch_size=BATCH_SIZE):
+    """Insert value tuples for ``fields`` into ``model``'s table; return the row count."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({", ".join(["%s"] * len(fields))})'
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def school_days(years=1, days=None, today=None):
+    """Weekdays from 1 September to 31 May of the last ``years`` school years, up to ``today``.
+
+    ``days`` keeps only that many of the most recent ones.
+    """
+    today = today or REFERENCE_DATE
+    last_year = today.year if today.month >= 9 else today.year - 1
+    result = []
+    for year in range(last_year - years + 1, last_year + 1):
+        day, end = date(year, 9, 1), min(date(year + 1, 5, 31), today)
+        while day <= end:
+            if day.weekday() < 5:
+                result.append(day)
+            day += timedelta(days=1)
+    return result[-days:] if days else result
+
+
+def seed_school(students=250, class_size=25, years=1, days=None, today=None, lessons_per_day=5, graded=0.3,
+                seed=0, batch_size=BATCH_SIZE, password=PASSWORD):
+    """Create a school with ``students`` students and return sample objects from it.
+
+    Classes have ``class_size`` students and ``lessons_per_day`` lessons per
+    school day; about ``graded`` of the class gets a grade in each lesson.
+    Lessons and grades are generated and written a class and a batch at a time.
+    """
+    rng = random.Random(seed)
+    password = make_password(password)
+    classes = -(-students // class_size)
+
+    with transaction.atomic():
+        teachers_group = Group.objects.get_or_create(name=TEACHERS_GROUP)[0]
+        students_group = Group.objects.get_or_create(name=STUDENTS_GROUP)[0]
+        subjects = _bulk_create(Subject, [Subject(name=name) for name in SUBJECTS], batch_size)
+        teachers = _bulk_create(User, [
+            User(username=f'teacher{n}', first_name='Teacher', last_name=subject.name, password=password)
+            for n, subject in enumerate(subjects)
+        ], batch_size)
+        school_classes = _bulk_create(SchoolClass, [SchoolClass(name=f'Class {n + 1}') for n in range(classes)],
+                                      batch_size)
+        pupils = _bulk_create(User, (
+            User(username=f'student{n}', first_name='Student', last_name=str(n), password=password)
+            for n in range(students)
+        ), batch_size)
+        rosters = {
+            school_class.id: [pupil.id for pupil in pupils[n * class_size:(n + 1) * class_size]]
+            for n, school_class in enumerate(school_classes)
+        }
+        _insert(SchoolClass.student.through, ['schoolclass', 'user'], (
+            (class_id, student_id) for class_id, student_ids in rosters.items() for student_id in student_ids
+        ), batch_size)
+        _insert(User.groups.through, ['user', 'group'], [
+            (teacher.id, teachers_group.id) for teacher in teachers
+        ] + [
+            (pupil.id, students_group.id) for pupil in pupils
+        ], batch_size)
+
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        days = school_days(years, days, today)
+        lesson, lessons, grades = None, 0, 0
+        for school_class in school_classes:
+            roster = rosters[school_class.id]
+            sample_size = max(1, round(len(roster) * graded))
+            slots = ((day, slot) for day in days for slot in range(lessons_per_day))
+            stats = {}
+            while batch := list(islice(slots, batch_size)):
+                first = RevisionCounter.allocate(len(batch))
+                created = Lesson.objects.bulk_create([
+                    Lesson(
+                        topic=f'{school_class.name} {day} #{slot + 1}',
+                        subject=subjects[(day.toordinal() + slot) % len(subjects)],
+                        teacher=teachers[(day.toordinal() + slot) % len(subjects)],
+                        school_class=school_class,
+                        date=day,
+                        revision=revision,
+                    )
+                    for revision, (day, slot) in enumerate(batch, start=first)
+                ])
+                grade_rows = [
+                    (lesson, student_id, rng.randint(1, 12))
+                    for lesson in created for student_id in rng.sample(roster, sample_size)
+                ]
+                first = RevisionCounter.allocate(len(grade_rows))
+                grades += _insert(Grade, ['lesson', 'student', 'grade', 'created_at', 'updated_at', 'revision'], (
+                    (lesson.id, student_id, value, now, now, revision)
+                    for revision, (lesson, student_id, value) in enumerate(grade_rows, start=first)
+                ), batch_size)
+                _fold(((student_id, lesson.subject_id, lesson.date, 1, value, value, value)
+                       for lesson, student_id, value in grade_rows), stats)
+                _insert(LessonProgress, ['lesson', 'graded', 'roster'], (
+                    (lesson.id, sample_size, len(roster)) for lesson in created
+                ), batch_size)
+                lessons += len(created)
+                lesson = created[-1]
+            # A class's students are in no other class, so its stats are complete.
+            _insert(StudentSubjectStats, ['student', 'subject', 'term', 'count', 'total', 'min_grade', 'max_grade'], (
+                (student_id, subject_id, term, *values) for (student_id, subject_id, term), values in stats.items()
+            ), batch_size)
+
+    return SimpleNamespace(
+        lesson=lesson,
+        teacher=lesson.teacher if lesson else teachers[0],
+        student=User.objects.get(pk=rosters[lesson.school_class_id][0]) if lesson else pupils[0],
+        classes=len(school_classes),
+        students=len(pupils),
+        lessons=lessons,
+        grades=grades,
+    )
@@ -0,0 +1,211 @@
+from django.db.backends.signals import connection_created
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import history, metrics, pagecache, progress, search, stats, sync
+from .models import Grade, Lesson, SchoolClass, Subject
+
+
+@receiver(post_save, sender=Grade)
+def grade_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.add_grade(instance.student_id, instance.lesson, instance.grade)
+        return
+    keys = [stats.stats_key(instance.student_id, instance.lesson)]
+    loaded = getattr(instance, '_loaded_values', {})
+    if loaded.get('lesson_id', instance.lesson_id) != instance.lesson_id or \
+            loaded.get('student_id', instance.student_id) != instance.student_id:
+        old_lesson = Lesson.objects.only('subject_id', 'date').get(pk=loaded['lesson_id'])
+        keys.append(stats.stats_key(loaded['student_id'], old_lesson))
+    stats.refresh_stats(keys)
+
+
+def _deleting(sender, instance, origin):
+    # Django sends pre_delete for every row one delete() call collects, cascades
+    # included, before it deletes any of them. The rows are stashed on the
+    # object or queryset delete() was called on.
+    if origin is not None:
+        batch = vars(origin).setdefault('_deleting', {}).setdefault(sender, {'rows': [], 'pending': 0})
+        batch['rows'].append(instance)
+        batch['pending'] += 1
+
+
+def _deleted(sender, instance, origin):
+    """The ``sender`` rows removed by the delete() call once its last one is gone, else None."""
+    batch = vars(origin).get('_deleting', {}).get(sender) if origin is not None else None
+    if batch is None:
+        return [instance]
+    batch['pending'] -= 1
+    if batch['pending']:
+        return None
+    del origin._deleting[sender]
+    return batch['rows']
+
+
+@receiver(pre_delete, sender=Grade)
+def grade_deleting(sender, instance, origin=None, **kwargs):
+    _deleting(sender, instance, origin)
+
+
+@receiver(post_delete, sender=Grade)
+def grade_deleted(sender, instance, origin=None, **kwargs):
+    grades = _deleted(sender, instance, origin)
+    if grades is not None:
+        stats.refresh_for_deleted_grades(grades)
+        pagecache.invalidate({grade.student_id for grade in grades})
+        sync.record_deletions('grade', [grade.pk for grade in grades])
+        progress.add_graded([grade.lesson_id for grade in grades], sign=-1)
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, raw=False, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if created or raw or 'subject_id' not in loaded or 'date' not in loaded:
+        return
+    if (loaded['subject_id'], loaded['date']) == (instance.subject_id, instance.date):
+        return
+    old_lesson = Lesson(subject_id=loaded['subject_id'], date=loaded['date'])
+    student_ids = list(instance.grades.values_list('student_id', flat=True))
+    stats.refresh_stats(
+        [stats.stats_key(student_id, old_lesson) for student_id in student_ids]
+        + [stats.stats_key(student_id, instance) for student_id in student_ids]
+    )
+
+
+@receiver(post_save, sender=Grade)
+def grade_changed_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    pagecache.invalidate({instance.student_id, loaded.get('student_id', instance.student_id)})
+
+
+def _invalidate_classes(class_ids):
+    pagecache.invalidate(
+        SchoolClass.student.through.objects.filter(schoolclass_id__in=class_ids).values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_changed_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    _invalidate_classes({instance.school_class_id, loaded.get('school_class_id', instance.school_class_id)})
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleting(sender, instance, origin=None, **kwargs):
+    _deleting(sender, instance, origin)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, origin=None, **kwargs):
+    lessons = _deleted(sender, instance, origin)
+    if lessons is not None:
+        _invalidate_classes({lesson.school_class_id for lesson in lessons})
+        sync.record_deletions('lesson', [lesson.pk for lesson in lessons])
+
+
+@receiver(m2m_changed, sender=SchoolClass.student.through)
+def class_roster_changed_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            pagecache.invalidate([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_student_ids = list(instance.student.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        pagecache.invalidate(pk_set)
+    elif action == 'post_clear':
+        pagecache.invalidate(instance.__dict__.pop('_cleared_student_ids', ()))
+
+
+@receiver(post_save, sender=SchoolClass)
+@receiver(post_delete, sender=SchoolClass)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def names_changed_pages(sender, raw=False, **kwargs):
+    # Class and subject names appear on every student's pages; renames are rare.
+    if not raw:
+        pagecache.invalidate(everyone=True)
+
+
+USER_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_renamed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Names appear in API responses whose validators cover no user rows; logins
+    # only save last_login.
+    if not (created or raw) and (update_fields is None or USER_NAME_FIELDS & set(update_fields)):
+        pagecache.bump(pagecache.USERS_SCOPE)
+
+
+@receiver(post_save, sender=Grade)
+def grade_saved_history(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        history.grade_saved(instance, created)
+
+
+@receiver(post_delete, sender=Grade)
+def grade_deleted_history(sender, instance, **kwargs):
+    history.grade_deleted(instance)
+
+
+@receiver(post_save, sender=Grade)
+def grade_saved_progress(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        progress.add_graded([instance.lesson_id])
+        return
+    old_lesson_id = getattr(instance, '_loaded_values', {}).get('lesson_id', instance.lesson_id)
+    if old_lesson_id != instance.lesson_id:
+        progress.add_graded([old_lesson_id], sign=-1)
+        progress.add_graded([instance.lesson_id])
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved_progress(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        progress.lesson_created(instance)
+    elif getattr(instance, '_loaded_values', {}).get('school_class_id', instance.school_class_id) \
+            != instance.school_class_id:
+        progress.lesson_moved(instance)
+
+
+@receiver(m2m_changed, sender=SchoolClass.student.through)
+def class_roster_changed_progress(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_class_ids = list(instance.classes.values_list('pk', flat=True))
+    elif action == 'post_clear' and reverse:
+        progress.refresh_rosters(instance.__dict__.pop('_cleared_class_ids', ()))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        progress.refresh_rosters(pk_set if reverse else [instance.pk])
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def student_deleting_progress(sender, instance, **kwargs):
+    # Deleting a user removes their roster rows without an m2m_changed signal.
+    instance._class_ids = list(SchoolClass.objects.filter(student=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def student_deleted_progress(sender, instance, **kwargs):
+    progress.refresh_rosters(instance.__dict__.pop('_class_ids', ()))
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'journal':
+        search.restore_triggers(using)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.instrument(connection)
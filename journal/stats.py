@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import Grade, Lesson, StudentSubjectStats
+
+STATS_FIELDS = ['count', 'total', 'min_grade', 'max_grade']
+
+
+def term_for_date(day):
+    """Terms run September–December ("2025-1") and January–August ("2025-2")."""
+    if day.month >= 9:
+        return f'{day.year}-1'
+    return f'{day.year - 1}-2'
+
+
+def term_bounds(term):
+    year, half = term.split('-')
+    year = int(year)
+    if half == '1':
+        return date(year, 9, 1), date(year, 12, 31)
+    return date(year + 1, 1, 1), date(year + 1, 8, 31)
+
+
+def current_term():
+    return term_for_date(timezone.localdate())
+
+
+def stats_key(student_id, lesson):
+    return student_id, lesson.subject_id, term_for_date(lesson.date)
+
+
+# Both backends support INSERT ... ON CONFLICT DO UPDATE; only the names of
+# the two-argument min/max functions differ.
+UPSERT_MIN_MAX = {
+    'postgresql': ('LEAST', 'GREATEST'),
+    'sqlite': ('MIN', 'MAX'),
+}
+
+
+def add_grade(student_id, lesson, value):
+    """Fold one new grade into its stats row with a single upsert."""
+    student_id, subject_id, term = stats_key(student_id, lesson)
+    least, greatest = UPSERT_MIN_MAX[connection.vendor]
+    qn = connection.ops.quote_name
+    table = qn(StudentSubjectStats._meta.db_table)
+    count, total, low, high = (qn(name) for name in STATS_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (student_id, subject_id, term, {count}, {total}, {low}, {high}) "
+            f"VALUES (%s, %s, %s, 1, %s, %s, %s) "
+            f"ON CONFLICT (student_id, term, subject_id) DO UPDATE SET "
+            f"{count} = {table}.{count} + 1, "
+            f"{total} = {table}.{total} + excluded.{total}, "
+            f"{low} = {least}({table}.{low}, excluded.{low}), "
+            f"{high} = {greatest}({table}.{high}, excluded.{high})",
+            [student_id, subject_id, term, value, value, value],
+        )
+
+
+def _fold(rows, stats=None):
+    stats = {} if stats is None else stats
+    for student_id, subject_id, day, count, total, low, high in rows:
+        key = (student_id, subject_id, term_for_date(day))
+        if key in stats:
+            entry = stats[key]
+            entry[0] += count
+            entry[1] += total
+            entry[2] = min(entry[2], low)
+            entry[3] = max(entry[3], high)
+        else:
+            stats[key] = [count, total, low, high]
+    return stats
+
+
+def _aggregated_grades():
+    return Grade.objects.values_list('student_id', 'lesson__subject_id', 'lesson__date').annotate(
+        Count('id'), Sum('grade'), Min('grade'), Max('grade'),
+    ).order_by()
+
+
+def _stats_objects(stats):
+    return [
+        StudentSubjectStats(
+            student_id=student_id, subject_id=subject_id, term=term,
+            count=count, total=total, min_grade=low, max_grade=high,
+        )
+        for (student_id, subject_id, term), (count, total, low, high) in stats.items()
+    ]
+
+
+def refresh_stats(keys):
+    """Recompute the (student_id, subject_id, term) rows in ``keys`` from ``Grade``.
+
+    Costs one aggregate query and one upsert however many keys are given.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    terms = {term for _, _, term in keys}
+    rows = _aggregated_grades().filter(
+        student_id__in={student_id for student_id, _, _ in keys},
+        lesson__subject_id__in={subject_id for _, subject_id, _ in keys},
+        lesson__date__gte=min(term_bounds(term)[0] for term in terms),
+        lesson__date__lte=max(term_bounds(term)[1] for term in terms),
+    )
+    stats = {key: value for key, value in _fold(rows).items() if key in keys}
+
+    empty = defaultdict(list)
+    for student_id, subject_id, term in keys - stats.keys():
+        empty[subject_id, term].append(student_id)
+    with transaction.atomic():
+        if empty:
+            condition = Q()
+            for (subject_id, term), student_ids in empty.items():
+                condition |= Q(subject_id=subject_id, term=term, student_id__in=student_ids)
+            StudentSubjectStats.objects.filter(condition).delete()
+        StudentSubjectStats.objects.bulk_create(
+            _stats_objects(stats),
+            update_conflicts=True,
+            unique_fields=['student', 'term', 'subject'],
+            update_fields=STATS_FIELDS,
+        )
+
+
+def refresh_for_grades(grades):
+    """Refresh the stats touched by ``grades``; each grade's lesson must be loaded."""
+    refresh_stats(stats_key(grade.student_id, grade.lesson) for grade in grades)
+
+
+def refresh_for_deleted_grades(grades):
+    """Refresh the stats touched by ``grades``, loading the lessons not cached on them in one query."""
+    missing = {grade.lesson_id for grade in grades if not Grade.lesson.is_cached(grade)}
+    lessons = Lesson.objects.only('subject_id', 'date').in_bulk(missing) if missing else {}
+    refresh_stats(
+        stats_key(grade.student_id, grade.lesson if Grade.lesson.is_cached(grade) else lessons[grade.lesson_id])
+        for grade in grades
+    )
+
+
+def rebuild_stats(batch_size=2000):
+    with transaction.atomic():
+        StudentSubjectStats.objects.all().delete()
+        stats = _fold(_aggregated_grades().iterator())
+        StudentSubjectStats.objects.bulk_create(_stats_objects(stats), batch_size=batch_size)
+    return len(stats)
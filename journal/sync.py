@@ -0,0 +1,53 @@
+import heapq
+
+from .models import Grade, Lesson, RevisionCounter, Tombstone
+
+CHANGES_LIMIT = 1000
+LESSON_SYNC_FIELDS = (
+    'id', 'revision', 'updated_at', 'topic', 'subject_id', 'school_class_id', 'teacher_id', 'homework', 'date',
+)
+GRADE_SYNC_FIELDS = ('id', 'revision', 'updated_at', 'created_at', 'student_id', 'lesson_id', 'grade')
+
+
+def record_deletions(model, object_ids):
+    """Leave a tombstone for each deleted row, allocating their revisions as one block."""
+    if object_ids:
+        first = RevisionCounter.allocate(len(object_ids))
+        Tombstone.objects.bulk_create(
+            Tombstone(model=model, object_id=object_id, revision=revision)
+            for revision, object_id in enumerate(object_ids, start=first)
+        )
+
+
+def _tagged(kind, rows):
+    for row in rows:
+        yield row['revision'], kind, row
+
+
+def changes_since(revision, limit=CHANGES_LIMIT):
+    """Return the lessons, grades and deletions with a revision above ``revision``.
+
+    At most ``limit`` changes are returned, oldest first. ``revision`` in the
+    result is the value to pass next time; ``has_more`` says whether that
+    call has anything left to catch up on already.
+    """
+    head = RevisionCounter.current()
+    sources = [
+        (kind, queryset.filter(revision__gt=revision, revision__lte=head).order_by('revision').values(*fields)[:limit + 1])
+        for kind, queryset, fields in [
+            ('lessons', Lesson.objects, LESSON_SYNC_FIELDS),
+            ('grades', Grade.objects, GRADE_SYNC_FIELDS),
+            ('deleted', Tombstone.objects, ('model', 'object_id', 'revision')),
+        ]
+    ]
+    changes = heapq.merge(*[_tagged(kind, rows) for kind, rows in sources], key=lambda change: change[0])
+    result = {'since': revision, 'revision': head, 'has_more': False, 'lessons': [], 'grades': [], 'deleted': []}
+    for count, (row_revision, kind, row) in enumerate(changes):
+        if count == limit:
+            result['has_more'] = True
+            break
+        result[kind].append(row)
+        result['revision'] = row_revision
+    else:
+        result['revision'] = max(head, revision)
+    return result
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from journal.gradebook import NO_GRADE
+
+register = template.Library()
+
+# A 40x200 grid is 8000 cells; looking each one up here is far cheaper than a
+# {% for %} loop over them in the template.
+CELLS = tuple('<td></td>' if grade == NO_GRADE else f'<td>{grade}</td>' for grade in range(256))
+
+
+@register.filter
+def grade_cells(grades):
+    """Render a gradebook row (an ``array('B')``) as its table cells."""
+    return mark_safe(''.join([CELLS[grade] for grade in grades]))
@@ -2,77 +2,113 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
 from datetime import date, timedelta
-from .models import SchoolClass, Subject, Lesson, Grade
-from users.roles import TEACHERS_GROUP, STUDENTS_GROUP
+from django.utils import timezone
+import csv
+import os
+import tempfile
+from array import array
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .models import (
+    SchoolClass, Subject, Lesson, Grade, GradeHistory, LessonProgress, PageVersion, StudentSubjectStats, RevisionCounter,
+)
+from .pagination import PAGE_SIZE, encode_cursor
+from .stats import rebuild_stats, term_for_date
+from .gradebook import build_gradebook
+from .importers import GradeImporter
+from .grading import upsert_grades
+from .progress import rebuild_progress
+from .search import search_lessons
+from . import analytics, history, metrics, pagecache, queries
+from .sync import changes_since
+from users import roles
+from users.roles import TEACHERS_GROUP, STUDENTS_GROUP, get_roles
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 User = get_user_model()
 
 
 class JournalTestCase(TestCase):
 
-    def setUp(self):
-        self.client = Client()
-        
-        self.teachers_group = Group.objects.create(name=TEACHERS_GROUP)
-        self.students_group = Group.objects.create(name=STUDENTS_GROUP)
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers_group = Group.objects.create(name=TEACHERS_GROUP)
+        cls.students_group = Group.objects.create(name=STUDENTS_GROUP)
         
-        self.teacher = User.objects.create_user(
+        cls.teacher = User.objects.create_user(
             username='teacher1',
             email='teacher@test.com',
             password='testpass123'
         )
-        self.teacher.groups.add(self.teachers_group)
+        cls.teacher.groups.add(cls.teachers_group)
         
-        self.student1 = User.objects.create_user(
+        cls.student1 = User.objects.create_user(
             username='student1',
             email='student1@test.com',
             password='testpass123'
         )
-        self.student1.groups.add(self.students_group)
+        cls.student1.groups.add(cls.students_group)
         
-        self.student2 = User.objects.create_user(
+        cls.student2 = User.objects.create_user(
             username='student2',
             email='student2@test.com',
             password='testpass123'
         )
-        self.student2.groups.add(self.students_group)
+        cls.student2.groups.add(cls.students_group)
         
-        self.school_class = SchoolClass.objects.create(name='Class 10A')
-        self.school_class.student.add(self.student1, self.student2)
+        cls.school_class = SchoolClass.objects.create(name='Class 10A')
+        cls.school_class.student.add(cls.student1, cls.student2)
         
-        self.subject = Subject.objects.create(name='Mathematics')
+        cls.subject = Subject.objects.create(name='Mathematics')
         
-        self.lesson1 = Lesson.objects.create(
+        cls.lesson1 = Lesson.objects.create(
             topic='Algebra Basics',
-            subject=self.subject,
-            school_class=self.school_class,
-            teacher=self.teacher,
+            subject=cls.subject,
+            school_class=cls.school_class,
+            teacher=cls.teacher,
             homework='Complete exercises 1-10',
             date=date.today()
         )
         
-        self.lesson2 = Lesson.objects.create(
+        cls.lesson2 = Lesson.objects.create(
             topic='Geometry Introduction',
-            subject=self.subject,
-            school_class=self.school_class,
-            teacher=self.teacher,
+            subject=cls.subject,
+            school_class=cls.school_class,
+            teacher=cls.teacher,
             homework='Read chapter 5',
             date=date.today() - timedelta(days=1)
         )
         
-        self.grade1 = Grade.objects.create(
-            student=self.student1,
-            lesson=self.lesson1,
+        cls.grade1 = Grade.objects.create(
+            student=cls.student1,
+            lesson=cls.lesson1,
             grade=8
         )
 
+    def setUp(self):
+        cache.clear()
+        caches[pagecache.PAGE_CACHE].clear()
+        self.client = Client()
+
 
 class LessonListViewTests(JournalTestCase):
 
     def test_teacher_lesson_list_authenticated(self):
         self.client.login(username='teacher1', password='testpass123')
-        response = self.client.get(reverse('teacher_lesson_list'))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('teacher_lesson_list'))
         
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Algebra Basics')
@@ -80,25 +116,147 @@ class LessonListViewTests(JournalTestCase):
         self.assertEqual(len(response.context['lessons']), 2)
     
     def test_teacher_lesson_list_unauthenticated(self):
-        response = self.client.get(reverse('teacher_lesson_list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('teacher_lesson_list'))
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
     
     def test_student_cannot_access_teacher_lesson_list(self):
         self.client.login(username='student1', password='testpass123')
-        response = self.client.get(reverse('teacher_lesson_list'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('teacher_lesson_list'))
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
     
     def test_lesson_list_ordering(self):
         self.client.login(username='teacher1', password='testpass123')
-        response = self.client.get(reverse('teacher_lesson_list'))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('teacher_lesson_list'))
         
         lessons = response.context['lessons']
         self.assertEqual(lessons[0], self.lesson1)  # Today's lesson first
         self.assertEqual(lessons[1], self.lesson2)  # Yesterday's lesson second
 
 
+class LessonPaginationTests(JournalTestCase):
+
+    def create_lessons(self, count):
+        Lesson.objects.bulk_create(
+            Lesson(
+                topic=f'Archived lesson {i}',
+                subject=self.subject,
+                school_class=self.school_class,
+                teacher=self.teacher,
+                date=date.today() - timedelta(days=2 + i // 3),
+            )
+            for i in range(count)
+        )
+
+    def test_lessons_are_paginated_by_cursor(self):
+        self.create_lessons(PAGE_SIZE + 10)
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(4):
+            first = self.client.get(reverse('teacher_lesson_list'))
+        page = first.context['page']
+        self.assertEqual(len(first.context['lessons']), PAGE_SIZE)
+        self.assertTrue(page.has_next)
+
+        second = self.client.get(reverse('teacher_lesson_list'), {'cursor': page.next_cursor})
+        self.assertEqual(len(second.context['lessons']), 12)
+        self.assertFalse(second.context['page'].has_next)
+
+        seen = [lesson.id for lesson in first.context['lessons']] + [lesson.id for lesson in second.context['lessons']]
+        expected = list(Lesson.objects.filter(teacher=self.teacher).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_query_count_is_constant(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('teacher_lesson_list'))
+
+        self.create_lessons(PAGE_SIZE + 10)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('teacher_lesson_list'))
+
+        self.assertEqual(len(small), len(large))
+
+    def test_date_range_filter(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('teacher_lesson_list'), {
+                'date_from': date.today().isoformat(),
+                'date_to': date.today().isoformat(),
+            })
+        self.assertEqual(list(response.context['lessons']), [self.lesson1])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('teacher_lesson_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_well_formed_cursor_with_wrong_values_is_rejected(self):
+        cursors = [encode_cursor(values) for values in (['abc', 1], [None, None], [{'a': 1}, 2], ['2025-01-01', 10 ** 30])]
+        self.client.login(username='teacher1', password='testpass123')
+        for cursor in cursors:
+            self.assertEqual(self.client.get(reverse('teacher_lesson_list'), {'cursor': cursor}).status_code, 400)
+            self.assertEqual(self.client.get(reverse('api_teacher_lessons'), {'cursor': cursor}).status_code, 400)
+
+        self.client.login(username='student1', password='testpass123')
+        for url in ('student_lesson_list', 'grade_list', 'api_student_lessons', 'api_student_grades'):
+            for cursor in cursors:
+                self.assertEqual(self.client.get(reverse(url), {'cursor': cursor}).status_code, 400, (url, cursor))
+        grouped = encode_cursor(['Mathematics', 'abc', 1])
+        self.assertEqual(self.client.get(reverse('grade_list'), {'group': 'subject', 'cursor': grouped}).status_code, 400)
+
+
+class RoleCacheTests(JournalTestCase):
+
+    def fresh(self, user):
+        # As loaded by the session middleware on a new request.
+        return User.objects.get(pk=user.pk)
+
+    def test_roles_are_cached_across_requests(self):
+        first, second = self.fresh(self.teacher), self.fresh(self.teacher)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_roles(first), {TEACHERS_GROUP})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles(second), {TEACHERS_GROUP})
+
+    def test_group_change_invalidates_cached_roles(self):
+        get_roles(self.student1)
+        self.student1.groups.add(self.teachers_group)
+        self.assertEqual(get_roles(self.fresh(self.student1)), {TEACHERS_GROUP, STUDENTS_GROUP})
+
+        self.teachers_group.user_set.remove(self.student1)
+        self.assertEqual(get_roles(self.fresh(self.student1)), {STUDENTS_GROUP})
+
+        self.students_group.user_set.clear()
+        self.assertEqual(get_roles(self.fresh(self.student1)), frozenset())
+
+    def test_roles_cached_by_another_process_are_not_reused(self):
+        teacher = self.fresh(self.teacher)
+        get_roles(teacher)
+        stale = cache.get(roles._cache_key(teacher))
+
+        self.teachers_group.user_set.remove(self.teacher)
+        # Another worker's cache still holds the entry it stored before the change.
+        cache.set(roles._cache_key(teacher), stale)
+
+        self.assertEqual(get_roles(self.fresh(self.teacher)), frozenset())
+
+    def test_role_check_costs_no_queries_on_warm_cache(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.client.get(reverse('home'))
+
+        # Session and user lookups only; the role check hits the cache.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Teacher')
+
+
 class LessonCreateViewTests(JournalTestCase):
 
     def test_teacher_can_create_lesson(self):
@@ -113,7 +271,8 @@ class LessonCreateViewTests(JournalTestCase):
             'date': date.today() + timedelta(days=1)
         }
         
-        response = self.client.post(reverse('teacher_lesson_create'), lesson_data)
+        with self.assertNumQueries(22):
+            response = self.client.post(reverse('teacher_lesson_create'), lesson_data)
         
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, reverse('teacher_lesson_list'))
@@ -125,14 +284,16 @@ class LessonCreateViewTests(JournalTestCase):
     
     def test_teacher_create_lesson_get_request(self):
         self.client.login(username='teacher1', password='testpass123')
-        response = self.client.get(reverse('teacher_lesson_create'))
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('teacher_lesson_create'))
         
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'form')
     
     def test_student_cannot_create_lesson(self):
         self.client.login(username='student1', password='testpass123')
-        response = self.client.get(reverse('teacher_lesson_create'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('teacher_lesson_create'))
         
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
@@ -148,7 +309,8 @@ class LessonCreateViewTests(JournalTestCase):
             'date': 'invalid-date'
         }
         
-        response = self.client.post(reverse('teacher_lesson_create'), invalid_data)
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse('teacher_lesson_create'), invalid_data)
         self.assertEqual(response.status_code, 200)  # Form redisplayed with errors
         
         self.assertFalse(Lesson.objects.filter(topic='').exists())
@@ -165,13 +327,14 @@ class GradeManagementTests(JournalTestCase):
             'grade': 9
         }
         
-        response = self.client.post(
-            reverse('set_grade', kwargs={
-                'lesson_id': self.lesson1.id,
-                'student_id': self.student2.id
-            }),
-            grade_data
-        )
+        with self.assertNumQueries(21):
+            response = self.client.post(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student2.id
+                }),
+                grade_data
+            )
         
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id}))
@@ -188,13 +351,14 @@ class GradeManagementTests(JournalTestCase):
             'grade': 10
         }
         
-        response = self.client.post(
-            reverse('set_grade', kwargs={
-                'lesson_id': self.lesson1.id,
-                'student_id': self.student1.id
-            }),
-            grade_data
-        )
+        with self.assertNumQueries(23):
+            response = self.client.post(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student1.id
+                }),
+                grade_data
+            )
         
         self.assertEqual(response.status_code, 302)
         
@@ -204,27 +368,42 @@ class GradeManagementTests(JournalTestCase):
     def test_set_grade_get_request(self):
         self.client.login(username='teacher1', password='testpass123')
         
-        response = self.client.get(
-            reverse('set_grade', kwargs={
-                'lesson_id': self.lesson1.id,
-                'student_id': self.student1.id
-            })
-        )
+        with self.assertNumQueries(7):
+            response = self.client.get(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student1.id
+                })
+            )
         
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'form')
         self.assertContains(response, self.student1.username)
         self.assertContains(response, self.lesson1.topic)
     
+    def test_set_grade_get_request_does_not_create_grade(self):
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(7):
+            self.client.get(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student2.id
+                })
+            )
+
+        self.assertFalse(Grade.objects.filter(student=self.student2, lesson=self.lesson1).exists())
+    
     def test_student_cannot_set_grade(self):
         self.client.login(username='student1', password='testpass123')
         
-        response = self.client.get(
-            reverse('set_grade', kwargs={
-                'lesson_id': self.lesson1.id,
-                'student_id': self.student1.id
-            })
-        )
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student1.id
+                })
+            )
         
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
@@ -238,13 +417,14 @@ class GradeManagementTests(JournalTestCase):
             'grade': 15
         }
         
-        response = self.client.post(
-            reverse('set_grade', kwargs={
-                'lesson_id': self.lesson1.id,
-                'student_id': self.student2.id
-            }),
-            invalid_grade_data
-        )
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                reverse('set_grade', kwargs={
+                    'lesson_id': self.lesson1.id,
+                    'student_id': self.student2.id
+                }),
+                invalid_grade_data
+            )
         
         self.assertEqual(response.status_code, 200)
         
@@ -255,14 +435,104 @@ class GradeManagementTests(JournalTestCase):
         ).exists())
 
 
+class BulkGradeTests(JournalTestCase):
+
+    def bulk_grade_data(self, grades):
+        data = {
+            'form-TOTAL_FORMS': len(grades),
+            'form-INITIAL_FORMS': len(grades),
+        }
+        for i, (student, grade) in enumerate(grades):
+            data[f'form-{i}-student'] = student.id
+            data[f'form-{i}-grade'] = grade
+        return data
+
+    def test_teacher_can_grade_whole_class(self):
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(20):
+            response = self.client.post(
+                reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id}),
+                self.bulk_grade_data([(self.student1, 11), (self.student2, 6)])
+            )
+
+        self.assertRedirects(response, reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id}))
+        self.assertEqual(Grade.objects.get(student=self.student1, lesson=self.lesson1).grade, 11)
+        self.assertEqual(Grade.objects.get(student=self.student2, lesson=self.lesson1).grade, 6)
+        self.assertEqual(Grade.objects.get(pk=self.grade1.pk).grade, 11)
+
+    def test_blank_grade_leaves_student_ungraded(self):
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(20):
+            self.client.post(
+                reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id}),
+                self.bulk_grade_data([(self.student1, ''), (self.student2, 5)])
+            )
+
+        self.assertEqual(Grade.objects.get(pk=self.grade1.pk).grade, 8)
+        self.assertEqual(Grade.objects.get(student=self.student2, lesson=self.lesson1).grade, 5)
+
+    def test_invalid_grade_rejects_whole_submission(self):
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id}),
+                self.bulk_grade_data([(self.student1, 10), (self.student2, 15)])
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Grade.objects.get(pk=self.grade1.pk).grade, 8)
+        self.assertFalse(Grade.objects.filter(student=self.student2, lesson=self.lesson1).exists())
+
+    def test_student_outside_class_is_rejected(self):
+        self.client.login(username='teacher1', password='testpass123')
+        outsider = User.objects.create(username='outsider')
+
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id}),
+                self.bulk_grade_data([(self.student1, 10), (outsider, 7)])
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Grade.objects.filter(student=outsider).exists())
+
+    def test_query_count_does_not_depend_on_class_size(self):
+        self.client.login(username='teacher1', password='testpass123')
+        url = reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id})
+        self.client.get(reverse('home'))
+
+        with CaptureQueriesContext(connection) as small_class:
+            self.client.post(url, self.bulk_grade_data([(self.student1, 9), (self.student2, 9)]))
+
+        extra = [User.objects.create(username=f'extra{i}') for i in range(20)]
+        self.school_class.student.add(*extra)
+        students = [self.student1, self.student2] + extra
+        with CaptureQueriesContext(connection) as large_class:
+            self.client.post(url, self.bulk_grade_data([(student, 10) for student in students]))
+
+        self.assertEqual(len(small_class), len(large_class))
+        self.assertEqual(Grade.objects.filter(lesson=self.lesson1, grade=10).count(), len(students))
+
+    def test_bulk_grade_requires_post(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('bulk_grade', kwargs={'lesson_id': self.lesson1.id}))
+        self.assertEqual(response.status_code, 405)
+
+
 class LessonDetailViewTests(JournalTestCase):
 
     def test_teacher_lesson_detail_view(self):
         self.client.login(username='teacher1', password='testpass123')
         
-        response = self.client.get(
-            reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
-        )
+        # Session, user and roles, then the lesson and the roster joined to its grades.
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
+            )
         
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.lesson1.topic)
@@ -275,27 +545,1252 @@ class LessonDetailViewTests(JournalTestCase):
         student1_data = next(sg for sg in student_grades if sg['student'] == self.student1)
         self.assertEqual(student1_data['grade'], self.grade1)
     
+    def test_query_count_does_not_grow_with_class_size(self):
+        students = [User.objects.create(username=f'pupil{i:02}') for i in range(20)]
+        self.school_class.student.add(*students)
+        Grade.objects.bulk_create(Grade(lesson=self.lesson1, student=student, grade=7) for student in students[::2])
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
+            )
+
+        student_grades = response.context['student_grades']
+        self.assertEqual(
+            [sg['student'].username for sg in student_grades],
+            sorted(student.username for student in [self.student1, self.student2, *students]),
+        )
+        self.assertEqual(sum(sg['grade'] is not None for sg in student_grades), 11)
+        self.assertContains(response, 'Mathematics')
+    
     def test_lesson_detail_nonexistent_lesson(self):
         self.client.login(username='teacher1', password='testpass123')
         
-        response = self.client.get(
-            reverse('teacher_lesson_detail', kwargs={'lesson_id': 9999})
-        )
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse('teacher_lesson_detail', kwargs={'lesson_id': 9999})
+            )
         
         self.assertEqual(response.status_code, 404)
 
 
+class GradebookTests(JournalTestCase):
+
+    def url(self, **params):
+        url = reverse('gradebook', kwargs={'class_id': self.school_class.id, 'subject_id': self.subject.id})
+        return f'{url}?{urlencode(params)}' if params else url
+
+    def test_matrix_has_a_row_per_student_and_a_column_per_lesson(self):
+        Grade.objects.create(student=self.student2, lesson=self.lesson2, grade=11)
+        gradebook = build_gradebook(self.school_class, self.subject, self.lesson2.date, self.lesson1.date)
+
+        self.assertEqual([lesson.id for lesson in gradebook.lessons], [self.lesson2.id, self.lesson1.id])
+        self.assertEqual(gradebook.grades[self.student1.id], array('B', [0, 8]))
+        self.assertEqual(gradebook.grades[self.student2.id], array('B', [11, 0]))
+        self.assertEqual(
+            [(student, average) for student, _, average in gradebook],
+            [(self.student1, 8), (self.student2, 11)],
+        )
+
+    def test_teacher_sees_gradebook(self):
+        self.client.login(username='teacher1', password='testpass123')
+        params = {'date_from': self.lesson2.date, 'date_to': self.lesson1.date}
+
+        # Session, user, roles, class and subject, then the roster and the graded lessons.
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url(**params))
+
+        self.assertContains(response, '<td></td><td>8</td>')
+        self.assertContains(response, self.student2.username)
+
+    def test_date_range_limits_columns(self):
+        self.client.login(username='teacher1', password='testpass123')
+        response = self.client.get(self.url(date_from=self.lesson1.date, date_to=self.lesson1.date))
+
+        self.assertEqual([lesson.id for lesson in response.context['gradebook'].lessons], [self.lesson1.id])
+
+    def test_student_cannot_see_gradebook(self):
+        self.client.login(username='student1', password='testpass123')
+        self.assertEqual(self.client.get(self.url()).status_code, 302)
+
+
+class LessonProgressTests(JournalTestCase):
+
+    def progress(self, lesson):
+        lesson_progress = LessonProgress.objects.get(lesson=lesson)
+        return lesson_progress.graded, lesson_progress.roster
+
+    def test_grades_are_counted_incrementally(self):
+        self.assertEqual(self.progress(self.lesson1), (1, 2))
+
+        grade = Grade.objects.create(student=self.student2, lesson=self.lesson1, grade=5)
+        self.assertEqual(self.progress(self.lesson1), (2, 2))
+        grade.delete()
+        self.assertEqual(self.progress(self.lesson1), (1, 2))
+
+        upsert_grades([
+            Grade(lesson=self.lesson1, student=self.student1, grade=3),
+            Grade(lesson=self.lesson1, student=self.student2, grade=4),
+            Grade(lesson=self.lesson2, student=self.student2, grade=5),
+        ])
+        self.assertEqual(self.progress(self.lesson1), (2, 2))
+        self.assertEqual(self.progress(self.lesson2), (1, 2))
+
+    def test_new_grades_are_recounted_not_incremented(self):
+        # As if a concurrent upsert had counted the same grade already.
+        LessonProgress.objects.filter(lesson=self.lesson1).update(graded=2)
+
+        upsert_grades([Grade(lesson=self.lesson1, student=self.student2, grade=4)])
+        self.assertEqual(self.progress(self.lesson1), (2, 2))
+
+    def test_lessons_without_progress_get_it_on_first_grade(self):
+        lesson, other = Lesson.objects.bulk_create([
+            Lesson(topic=topic, subject=self.subject, teacher=self.teacher, school_class=self.school_class,
+                   date=self.lesson1.date)
+            for topic in ('Bulk one', 'Bulk two')
+        ])
+
+        upsert_grades([Grade(lesson=lesson, student=self.student1, grade=7)])
+        Grade.objects.create(lesson=other, student=self.student2, grade=8)
+        self.assertEqual(self.progress(lesson), (1, 2))
+        self.assertEqual(self.progress(other), (1, 2))
+
+    def test_subject_delete_updates_progress_once(self):
+        students = [User.objects.create(username=f'extra{i}') for i in range(6)]
+        for student in students:
+            Grade.objects.create(student=student, lesson=self.lesson1, grade=6)
+            Grade.objects.create(student=student, lesson=self.lesson2, grade=9)
+        other = Subject.objects.create(name='Physics')
+        Lesson.objects.filter(pk=self.lesson2.pk).update(subject=other)
+
+        with CaptureQueriesContext(connection) as queries:
+            Subject.objects.get(pk=other.pk).delete()
+
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "journal_lessonprogress"')]), 1)
+        self.assertEqual(self.progress(self.lesson1), (7, 2))
+
+    def test_roster_changes_update_every_lesson_of_the_class(self):
+        newcomer = User.objects.create_user(username='newcomer', password='testpass123')
+
+        self.school_class.student.add(newcomer)
+        self.assertEqual(self.progress(self.lesson1), (1, 3))
+        self.assertEqual(self.progress(self.lesson2), (0, 3))
+
+        self.school_class.student.remove(self.student2)
+        self.assertEqual(self.progress(self.lesson2), (0, 2))
+
+        newcomer.classes.clear()
+        self.assertEqual(self.progress(self.lesson2), (0, 1))
+
+        self.student2.classes.add(self.school_class)
+        self.student2.delete()
+        self.assertEqual(self.progress(self.lesson2), (0, 1))
+
+    def test_moving_a_lesson_recounts_its_roster(self):
+        other = SchoolClass.objects.create(name='Class 11B')
+        lesson = Lesson.objects.get(pk=self.lesson2.pk)
+        lesson.school_class = other
+        lesson.save()
+
+        self.assertEqual(self.progress(self.lesson2), (0, 0))
+
+    def test_rebuild_matches_incremental_counts(self):
+        Grade.objects.create(student=self.student2, lesson=self.lesson2, grade=5)
+        self.school_class.student.remove(self.student1)
+        expected = sorted(LessonProgress.objects.values_list('lesson_id', 'graded', 'roster'))
+
+        self.assertEqual(rebuild_progress(), 2)
+        self.assertEqual(sorted(LessonProgress.objects.values_list('lesson_id', 'graded', 'roster')), expected)
+
+
+class TeacherDashboardTests(JournalTestCase):
+
+    def test_dashboard_lists_lessons_to_grade_and_upcoming(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('set_grade', kwargs={'lesson_id': self.lesson2.id, 'student_id': self.student2.id}),
+                {'student': self.student2.id, 'lesson': self.lesson2.id, 'grade': 9},
+            )
+
+        response = self.client.get(reverse('teacher_dashboard'))
+
+        self.assertEqual(response.context['graded_today'], 1)
+        self.assertEqual([lesson.id for lesson in response.context['to_grade']], [self.lesson1.id, self.lesson2.id])
+        self.assertContains(response, '1/2 graded, 1 to go', count=2)
+        self.assertEqual([lesson.id for lesson in response.context['upcoming']], [self.lesson1.id])
+
+    def test_query_count_does_not_grow_with_lessons(self):
+        Lesson.objects.bulk_create(
+            Lesson(topic=f'Lesson {n}', subject=self.subject, school_class=self.school_class, teacher=self.teacher,
+                   date=date.today() + timedelta(days=n))
+            for n in range(-20, 20)
+        )
+        rebuild_progress()
+        self.client.login(username='teacher1', password='testpass123')
+
+        # Session, user and roles, then upcoming lessons, lessons to grade and today's grades.
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('teacher_dashboard'))
+
+        self.assertEqual(len(response.context['upcoming']), 10)
+        self.assertEqual(len(response.context['to_grade']), 10)
+
+    def test_student_cannot_access_dashboard(self):
+        self.client.login(username='student1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('teacher_dashboard')).status_code, 302)
+
+
 class StudentViewTests(JournalTestCase):
 
     def test_student_grade_list(self):
         self.client.login(username='student1', password='testpass123')
         
-        response = self.client.get(reverse('grade_list'))
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('grade_list'))
         
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, str(self.grade1.grade))
         self.assertContains(response, self.lesson1.topic)
 
+    def create_graded_lessons(self, count, subject=None):
+        lessons = Lesson.objects.bulk_create(
+            Lesson(
+                topic=f'{(subject or self.subject).name} lesson {i}',
+                subject=subject or self.subject,
+                school_class=self.school_class,
+                teacher=self.teacher,
+                date=date.today() - timedelta(days=2 + i),
+            )
+            for i in range(count)
+        )
+        Grade.objects.bulk_create(Grade(student=self.student1, lesson=lesson, grade=5) for lesson in lessons)
+        # bulk_create sends no signals.
+        pagecache.invalidate([self.student1.pk])
+
+    def test_student_grade_query_count_is_constant(self):
+        self.client.login(username='student1', password='testpass123')
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('grade_list'))
+
+        self.create_graded_lessons(30)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('grade_list'))
+
+        self.assertEqual(len(few), len(many))
+        self.assertContains(response, 'Class 10A', count=31)
+
+    def test_student_grades_are_paginated(self):
+        self.create_graded_lessons(PAGE_SIZE)
+        self.client.login(username='student1', password='testpass123')
+
+        with self.assertNumQueries(6):
+            first = self.client.get(reverse('grade_list'))
+        second = self.client.get(reverse('grade_list'), {'cursor': first.context['page'].next_cursor})
+
+        self.assertEqual(len(first.context['grades']), PAGE_SIZE)
+        self.assertEqual(len(second.context['grades']), 1)
+        self.assertEqual(second.context['grades'][0].lesson.topic, 'Mathematics lesson 49')
+
+    def test_student_grades_grouped_by_subject(self):
+        self.create_graded_lessons(2, Subject.objects.create(name='Art'))
+        self.client.login(username='student1', password='testpass123')
+
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('grade_list'), {'group': 'subject'})
+
+        subjects = [grade.lesson.subject.name for grade in response.context['grades']]
+        self.assertEqual(subjects, ['Art', 'Art', 'Mathematics'])
+        self.assertContains(response, '<th colspan="5">Art</th>', html=True)
+
+
+class StudentLessonListTests(JournalTestCase):
+
+    def test_student_sees_lessons_of_all_their_classes(self):
+        other_class = SchoolClass.objects.create(name='Chess club')
+        other_class.student.add(self.student1)
+        club_lesson = Lesson.objects.create(
+            topic='Openings',
+            subject=self.subject,
+            school_class=other_class,
+            teacher=self.teacher,
+            date=date.today() - timedelta(days=3)
+        )
+        self.client.login(username='student1', password='testpass123')
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('student_lesson_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['lessons']), [self.lesson1, self.lesson2, club_lesson])
+
+    def test_student_without_class_sees_no_lessons(self):
+        self.school_class.student.remove(self.student2)
+        self.client.login(username='student2', password='testpass123')
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('student_lesson_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'No lessons found.')
+
+    def test_lessons_are_fetched_in_one_query_without_distinct(self):
+        self.client.login(username='student1', password='testpass123')
+        self.client.get(reverse('home'))
+
+        # Session, user, the page cache versions and the lesson page itself.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_lesson_list'))
+        self.assertEqual(len(queries), 4)
+        self.assertContains(response, 'Mathematics')
+        self.assertNotIn('DISTINCT', queries[-1]['sql'])
+
+
+class HomeworkFeedTests(JournalTestCase):
+
+    def test_feed_shows_this_weeks_homework(self):
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        Lesson.objects.create(
+            topic='No homework', subject=self.subject, school_class=self.school_class, teacher=self.teacher,
+            date=today,
+        )
+        Lesson.objects.create(
+            topic='Last week', subject=self.subject, school_class=self.school_class, teacher=self.teacher,
+            homework='Old exercises', date=monday - timedelta(days=1),
+        )
+        self.client.login(username='student1', password='testpass123')
+
+        response = self.client.get(reverse('homework_feed'))
+
+        self.assertContains(response, 'Complete exercises 1-10')
+        self.assertNotContains(response, 'No homework')
+        self.assertNotContains(response, 'Old exercises')
+
+        response = self.client.get(reverse('homework_feed'), {'date_from': monday - timedelta(days=7)})
+        self.assertContains(response, 'Old exercises')
+
+    def test_teacher_cannot_see_feed(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('homework_feed')).status_code, 302)
+
+
+class LessonSearchTests(JournalTestCase):
+
+    def search(self, query, user=None):
+        scope = queries.student_lessons(user) if user else queries.teacher_lessons(self.teacher)
+        return [lesson.topic for lesson in search_lessons(query, scope)]
+
+    def test_topic_matches_rank_above_homework_matches(self):
+        Lesson.objects.create(
+            topic='Revision', subject=self.subject, school_class=self.school_class, teacher=self.teacher,
+            homework='Geometry worksheet', date=date.today(),
+        )
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.search('geometry'), ['Geometry Introduction', 'Revision'])
+        self.assertEqual(self.search('geo'), ['Geometry Introduction', 'Revision'])
+        self.assertEqual(self.search('chapter geometry'), ['Geometry Introduction'])
+
+    @skipUnless(connection.vendor == 'sqlite', "The index has triggers on SQLite only")
+    def test_migrate_restores_dropped_triggers(self):
+        # As a later migration that rebuilds journal_lesson would.
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER journal_lesson_fts_update")
+        Lesson.objects.filter(pk=self.lesson1.pk).update(homework='Learn the quadratic formula')
+        self.assertEqual(self.search('quadratic'), [])
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(self.search('quadratic'), ['Algebra Basics'])
+        Lesson.objects.filter(pk=self.lesson1.pk).update(homework='Read about parabolas')
+        self.assertEqual(self.search('parabolas'), ['Algebra Basics'])
+
+    def test_index_follows_lesson_changes(self):
+        lesson = Lesson.objects.get(pk=self.lesson1.pk)
+        lesson.homework = 'Learn the quadratic formula'
+        lesson.save()
+        self.assertEqual(self.search('quadratic'), ['Algebra Basics'])
+
+        Lesson.objects.filter(pk=self.lesson1.pk).update(topic='Polynomials')
+        self.assertEqual(self.search('algebra'), [])
+        self.assertEqual(self.search('polynomials'), ['Polynomials'])
+
+        lesson.delete()
+        self.assertEqual(self.search('quadratic'), [])
+
+    def test_search_is_limited_to_the_users_lessons(self):
+        outsider = User.objects.create_user(username='outsider', password='testpass123')
+        self.assertEqual(self.search('algebra', self.student1), ['Algebra Basics'])
+        self.assertEqual(self.search('algebra', outsider), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('algebra") ^*'), ['Algebra Basics'])
+        self.assertEqual(self.search(' -*" '), [])
+
+    def test_search_page_and_api(self):
+        self.client.login(username='student1', password='testpass123')
+
+        response = self.client.get(reverse('lesson_search'), {'q': 'exercises'})
+        self.assertContains(response, 'Algebra Basics')
+
+        # Session, user, the ETag's revision and versions, then the ranked ids and their lessons.
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('api_lesson_search'), {'q': 'chapter'})
+        self.assertEqual([lesson['topic'] for lesson in response.json()['results']], ['Geometry Introduction'])
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_lesson_search'), {'q': 'chapter'}).status_code, 401)
+
+
+class StudentPageCacheTests(JournalTestCase):
+
+    def get_grades(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('grade_list'))
+        return response, len(queries)
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='student1', password='testpass123')
+        self.client.get(reverse('home'))
+
+    def test_repeat_visit_is_served_from_cache(self):
+        first, cold = self.get_grades()
+        second, warm = self.get_grades()
+
+        self.assertLess(warm, cold)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(pagecache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_grade_edit_expires_page(self):
+        self.get_grades()
+        self.grade1.grade = 3
+        self.grade1.save()
+
+        response, _ = self.get_grades()
+
+        self.assertEqual(response.context['grades'][0].grade, 3)
+
+    def test_bulk_grading_expires_page(self):
+        self.get_grades()
+        upsert_grades([Grade(student=self.student1, lesson=self.lesson2, grade=7)])
+
+        response, _ = self.get_grades()
+
+        self.assertContains(response, self.lesson2.topic)
+
+    def test_roster_change_expires_lesson_list(self):
+        self.client.get(reverse('student_lesson_list'))
+        self.school_class.student.remove(self.student1)
+
+        response = self.client.get(reverse('student_lesson_list'))
+
+        self.assertContains(response, 'No lessons found.')
+
+    def test_version_bumped_by_another_process_expires_page(self):
+        self.get_grades()
+        # All another worker or a management command leaves behind is the committed version row.
+        Grade.objects.filter(pk=self.grade1.pk).update(grade=2)
+        PageVersion.objects.update_or_create(scope=f'student:{self.student1.pk}', defaults={'version': 42})
+
+        response, _ = self.get_grades()
+
+        self.assertEqual(response.context['grades'][0].grade, 2)
+
+    def test_other_students_pages_stay_cached(self):
+        self.get_grades()
+        Grade.objects.create(student=self.student2, lesson=self.lesson2, grade=9)
+
+        self.get_grades()
+
+        self.assertEqual(pagecache.stats()['hits'], 1)
+
+    def test_stats_command(self):
+        self.get_grades()
+        self.get_grades()
+        out = StringIO()
+
+        call_command('pagecache_stats', '--reset', stdout=out)
+
+        self.assertIn('hit ratio: 50.0%', out.getvalue())
+        self.assertEqual(pagecache.stats()['hits'], 0)
+
+
+class StudentSubjectStatsTests(JournalTestCase):
+
+    def stats_for(self, student, lesson=None):
+        lesson = lesson or self.lesson1
+        return StudentSubjectStats.objects.get(
+            student=student, subject=lesson.subject, term=term_for_date(lesson.date)
+        )
+
+    def snapshot(self):
+        return sorted(StudentSubjectStats.objects.values_list(
+            'student_id', 'subject_id', 'term', 'count', 'total', 'min_grade', 'max_grade'
+        ))
+
+    def test_created_grade_updates_stats(self):
+        Grade.objects.create(student=self.student1, lesson=self.lesson2, grade=4)
+        stats = self.stats_for(self.student1, self.lesson2)
+        if term_for_date(self.lesson1.date) == term_for_date(self.lesson2.date):
+            self.assertEqual((stats.count, stats.total, stats.min_grade, stats.max_grade), (2, 12, 4, 8))
+            self.assertEqual(stats.average, 6)
+        else:
+            self.assertEqual((stats.count, stats.total), (1, 4))
+
+    def test_updated_and_deleted_grades_update_stats(self):
+        self.grade1.grade = 3
+        self.grade1.save()
+        stats = self.stats_for(self.student1)
+        self.assertEqual((stats.count, stats.total, stats.min_grade, stats.max_grade), (1, 3, 3, 3))
+
+        self.grade1.delete()
+        self.assertFalse(StudentSubjectStats.objects.filter(student=self.student1).exists())
+
+    def test_deleting_lesson_clears_stats(self):
+        self.lesson1.delete()
+        self.assertFalse(StudentSubjectStats.objects.exists())
+
+    def test_cascade_refreshes_stats_once_per_delete(self):
+        students = [User.objects.create(username=f'extra{i}') for i in range(6)]
+        for student in students:
+            Grade.objects.create(student=student, lesson=self.lesson1, grade=6)
+            Grade.objects.create(student=student, lesson=self.lesson2, grade=9)
+
+        with CaptureQueriesContext(connection) as queries:
+            Lesson.objects.get(pk=self.lesson1.pk).delete()
+
+        # At most one clean-up of the emptied rows and one upsert, however many grades went.
+        self.assertLessEqual(len([query for query in queries if 'journal_studentsubjectstats' in query['sql']]), 2)
+        incremental = self.snapshot()
+        rebuild_stats()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_bulk_path_updates_stats(self):
+        upsert_grades([
+            Grade(student=self.student1, lesson=self.lesson1, grade=12),
+            Grade(student=self.student2, lesson=self.lesson1, grade=5),
+        ])
+        self.assertEqual(self.stats_for(self.student1).total, 12)
+        self.assertEqual(self.stats_for(self.student2).total, 5)
+
+    def test_lesson_subject_change_moves_stats(self):
+        physics = Subject.objects.create(name='Physics')
+        lesson = Lesson.objects.get(pk=self.lesson1.pk)
+        lesson.subject = physics
+        lesson.save()
+
+        self.assertFalse(StudentSubjectStats.objects.filter(subject=self.subject).exists())
+        self.assertEqual(self.stats_for(self.student1, lesson).total, 8)
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        Grade.objects.create(student=self.student2, lesson=self.lesson1, grade=7)
+        Grade.objects.create(student=self.student2, lesson=self.lesson2, grade=11)
+        incremental = self.snapshot()
+
+        rebuild_stats()
+
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_student_grade_shows_subject_averages(self):
+        self.client.login(username='student1', password='testpass123')
+        response = self.client.get(reverse('grade_list'))
+        self.assertContains(response, '8.00')
+        self.assertEqual(len(response.context['subject_stats']), 1)
+
+
+class GradeImportTests(JournalTestCase):
+
+    def write_csv(self, rows):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['username', 'topic', 'date', 'grade'])
+            writer.writerows(rows)
+        self.addCleanup(lambda: [os.remove(p) for p in (path, path + '.errors.csv') if os.path.exists(p)])
+        return path
+
+    def test_import_command_upserts_valid_rows_and_reports_errors(self):
+        outsider = User.objects.create(username='outsider')
+        outsider.groups.add(self.students_group)
+        path = self.write_csv([
+            ['student1', 'Algebra Basics', date.today().isoformat(), '12'],
+            ['student2', 'Geometry Introduction', '', '7'],
+            ['nobody', 'Algebra Basics', '', '5'],
+            ['student2', 'Algebra Basics', '', '13'],
+            ['student2', 'Algebra Basics', '2001-01-01', '5'],
+            ['outsider', 'Algebra Basics', '', '5'],
+        ])
+
+        out = StringIO()
+        call_command('import_grades', path, stdout=out)
+
+        self.assertIn('Imported 2 grades.', out.getvalue())
+        self.assertEqual(Grade.objects.get(pk=self.grade1.pk).grade, 12)
+        self.assertEqual(Grade.objects.get(student=self.student2, lesson=self.lesson2).grade, 7)
+        self.assertFalse(Grade.objects.filter(student=self.student2, lesson=self.lesson1).exists())
+        self.assertEqual(
+            StudentSubjectStats.objects.filter(student=self.student1).values_list('max_grade', flat=True)[0], 12
+        )
+
+        with open(path + '.errors.csv', newline='') as f:
+            errors = list(csv.DictReader(f))
+        self.assertEqual([row['line'] for row in errors], ['4', '5', '6', '7'])
+        self.assertIn('Unknown student', errors[0]['error'])
+        self.assertIn('less than or equal to 12', errors[1]['error'])
+        self.assertIn('took place on', errors[2]['error'])
+        self.assertIn('not in the class', errors[3]['error'])
+
+    def test_import_writes_in_batches(self):
+        path = self.write_csv([
+            ['student1', 'Algebra Basics', '', '3'],
+            ['student2', 'Algebra Basics', '', '4'],
+            ['student1', 'Geometry Introduction', '', '5'],
+        ])
+        with CaptureQueriesContext(connection) as one_batch:
+            call_command('import_grades', path, stdout=StringIO())
+        with CaptureQueriesContext(connection) as small_batches:
+            call_command('import_grades', path, '--batch-size', '1', stdout=StringIO())
+        self.assertLess(len(one_batch), len(small_batches))
+        self.assertFalse(os.path.exists(path + '.errors.csv'))
+
+    def test_admin_import(self):
+        User.objects.create_superuser('admin', 'admin@test.com', 'testpass123')
+        self.client.login(username='admin', password='testpass123')
+        upload = SimpleUploadedFile(
+            'grades.csv', b'username,topic,date,grade\nstudent2,Algebra Basics,,9\n', content_type='text/csv'
+        )
+
+        response = self.client.post(reverse('admin:journal_grade_import'), {'file': upload})
+
+        self.assertRedirects(response, reverse('admin:journal_grade_changelist'))
+        self.assertEqual(Grade.objects.get(student=self.student2, lesson=self.lesson1).grade, 9)
+
+    def test_admin_import_of_malformed_csv(self):
+        User.objects.create_superuser('admin', 'admin@test.com', 'testpass123')
+        self.client.login(username='admin', password='testpass123')
+        oversized = 'x' * (csv.field_size_limit() + 1)
+        upload = SimpleUploadedFile(
+            'grades.csv', f'username,topic,date,grade\nstudent2,{oversized},,9\n'.encode(), content_type='text/csv'
+        )
+
+        response = self.client.post(reverse('admin:journal_grade_import'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('field larger than field limit', response.context['form'].errors['file'][0])
+
+    def test_admin_import_of_broken_xlsx(self):
+        User.objects.create_superuser('admin', 'admin@test.com', 'testpass123')
+        self.client.login(username='admin', password='testpass123')
+        upload = SimpleUploadedFile('g.xlsx', b'not a zip file at all')
+
+        response = self.client.post(reverse('admin:journal_grade_import'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.xlsx', response.context['form'].errors['file'][0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'g.xlsx')
+            with open(path, 'wb') as f:
+                f.write(b'not a zip file at all')
+            with self.assertRaisesMessage(CommandError, '.xlsx'):
+                call_command('import_grades', path, stdout=StringIO())
+
+
+class GradeExportTests(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Grade.objects.create(student=self.student2, lesson=self.lesson2, grade=4)
+
+    def test_staff_can_stream_csv_export(self):
+        self.teacher.is_staff = True
+        self.teacher.save()
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('export_grades'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][0], 'username')
+        self.assertEqual(rows[1], [
+            'student1', '', '', 'Class 10A', 'Mathematics', 'teacher1', date.today().isoformat(), 'Algebra Basics', '8',
+        ])
+        self.assertEqual(len(rows), 3)
+
+    async def test_export_is_streamed_asynchronously_under_asgi(self):
+        clerk = await User.objects.acreate(username='clerk', is_staff=True)
+        await self.async_client.aforce_login(clerk)
+
+        response = await self.async_client.get(reverse('export_grades'))
+
+        self.assertTrue(response.is_async)
+        parts = aiter(response)
+        header = await anext(parts)
+        # A sync iterator would have been read into a list, query included, before the first part.
+        await Grade.objects.acreate(student=self.student2, lesson=self.lesson1, grade=7)
+        rows = [header.decode()] + [part.decode() async for part in parts]
+        self.assertEqual([row.split(',')[0] for row in rows], ['username', 'student1', 'student2', 'student2'])
+
+    def test_export_filters(self):
+        self.teacher.is_staff = True
+        self.teacher.save()
+        self.client.login(username='teacher1', password='testpass123')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('export_grades'), {'date_to': self.lesson2.date.isoformat()})
+
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row[0] for row in rows[1:]], ['student2'])
+
+    def test_non_staff_cannot_export(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('export_grades'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_grades', '--subject', str(self.subject.id), '--from', date.today().isoformat(), stdout=out)
+        rows = list(csv.reader(out.getvalue().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][-1], '8')
+
+
+class JsonApiTests(JournalTestCase):
+
+    def test_teacher_lessons(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('api_teacher_lessons'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([lesson['topic'] for lesson in data['results']], ['Algebra Basics', 'Geometry Introduction'])
+        self.assertEqual(data['results'][0]['subject_name'], 'Mathematics')
+        self.assertIsNone(data['next'])
+
+    def test_teacher_lesson_detail(self):
+        self.client.login(username='teacher1', password='testpass123')
+        with self.assertNumQueries(11):
+            response = self.client.get(reverse('api_teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id}))
+
+        data = response.json()
+        self.assertEqual(data['lesson']['class_name'], 'Class 10A')
+        self.assertEqual(
+            [(student['username'], student['grade']) for student in data['students']],
+            [('student1', 8), ('student2', None)]
+        )
+
+    def test_student_endpoints(self):
+        self.client.login(username='student1', password='testpass123')
+
+        with self.assertNumQueries(6):
+            lessons = self.client.get(reverse('api_student_lessons')).json()
+        grades = self.client.get(reverse('api_student_grades')).json()
+
+        self.assertEqual(len(lessons['results']), 2)
+        self.assertEqual(grades['results'], [{
+            'id': self.grade1.id,
+            'grade': 8,
+            'lesson': {
+                'id': self.lesson1.id,
+                'topic': 'Algebra Basics',
+                'date': date.today().isoformat(),
+                'subject_name': 'Mathematics',
+            },
+        }])
+
+    def test_repeat_poll_gets_304_without_serializing(self):
+        self.client.login(username='student1', password='testpass123')
+        url = reverse('api_student_grades')
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+
+        # Session, user, the freshness aggregate and the page cache versions only.
+        with self.assertNumQueries(4):
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+
+        Grade.objects.create(student=self.student1, lesson=self.lesson2, grade=10)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_roster_change_changes_lesson_etag(self):
+        self.client.login(username='teacher1', password='testpass123')
+        url = reverse('api_teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
+        with self.assertNumQueries(11):
+            etag = self.client.get(url)['ETag']
+
+        self.school_class.student.add(User.objects.create(username='newcomer'))
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renames_change_etags(self):
+        # Last-Modified has whole seconds; keep the rename from landing in the same one.
+        Lesson.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        PageVersion.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client.login(username='teacher1', password='testpass123')
+        detail_url = reverse('api_teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
+        lessons = self.client.get(reverse('api_teacher_lessons'))
+        detail = self.client.get(detail_url)
+
+        self.school_class.name = 'Class 11A'
+        self.school_class.save()
+        renamed = self.client.get(reverse('api_teacher_lessons'), HTTP_IF_NONE_MATCH=lessons['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.json()['results'][0]['class_name'], 'Class 11A')
+        self.assertEqual(
+            self.client.get(reverse('api_teacher_lessons'), HTTP_IF_MODIFIED_SINCE=lessons['Last-Modified']).status_code,
+            200,
+        )
+
+        detail = self.client.get(detail_url)
+        student = User.objects.get(pk=self.student2.pk)
+        student.first_name = 'Renamed'
+        student.save()
+        renamed = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertIn('Renamed', [row['first_name'] for row in renamed.json()['students']])
+
+    def test_lesson_edits_change_grade_etags(self):
+        self.client.login(username='student1', password='testpass123')
+        url = reverse('api_student_grades')
+        etag = self.client.get(url)['ETag']
+
+        lesson = Lesson.objects.get(pk=self.lesson1.pk)
+        lesson.topic = 'Algebra Revisited'
+        lesson.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['results'][0]['lesson']['topic'], 'Algebra Revisited')
+
+    def test_deletes_advance_last_modified(self):
+        # Last-Modified has whole seconds; keep the deletes from landing in the same one.
+        Lesson.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Grade.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        PageVersion.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Grade.objects.create(student=self.student2, lesson=self.lesson1, grade=4)
+        Grade.objects.filter(student=self.student2).update(updated_at=timezone.now() - timedelta(hours=1))
+        PageVersion.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        detail_url = reverse('api_teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id})
+        urls = {
+            'teacher1': [reverse('api_teacher_lessons'), detail_url],
+            'student1': [reverse('api_student_grades'), reverse('api_student_lessons')],
+        }
+        last_modified = {}
+        for username, user_urls in urls.items():
+            self.client.login(username=username, password='testpass123')
+            for url in user_urls:
+                last_modified[url] = self.client.get(url)['Last-Modified']
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified[url]).status_code, 304)
+
+        Grade.objects.get(student=self.student2).delete()
+        self.grade1.delete()
+        self.lesson2.delete()
+        for username, user_urls in urls.items():
+            self.client.login(username=username, password='testpass123')
+            for url in user_urls:
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified[url]).status_code, 200, url
+                )
+
+    def test_login_keeps_etags(self):
+        self.client.login(username='teacher1', password='testpass123')
+        etag = self.client.get(reverse('api_teacher_lessons'))['ETag']
+        Client().login(username='student1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('api_teacher_lessons'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_api_access_control(self):
+        self.assertEqual(self.client.get(reverse('api_student_grades')).status_code, 401)
+        self.client.login(username='teacher1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('api_student_grades')).status_code, 403)
+
+
+class IncrementalSyncTests(JournalTestCase):
+
+    def test_every_save_gets_a_newer_revision(self):
+        before = self.grade1.updated_at
+        revisions = [self.lesson1.revision, self.lesson2.revision, self.grade1.revision]
+        self.grade1.grade = 9
+        self.grade1.save()
+
+        self.assertEqual(revisions, sorted(set(revisions)))
+        self.assertEqual(self.grade1.revision, RevisionCounter.current())
+        self.assertGreater(self.grade1.revision, revisions[-1])
+        self.assertGreater(self.grade1.updated_at, before)
+
+    def test_changes_since_returns_only_the_delta(self):
+        head = RevisionCounter.current()
+        self.grade1.grade = 4
+        self.grade1.save()
+        Grade.objects.get(pk=self.grade1.pk).delete()
+        upsert_grades([Grade(student=self.student2, lesson=self.lesson2, grade=6)])
+
+        changes = changes_since(head)
+
+        self.assertEqual(changes['lessons'], [])
+        self.assertEqual([(grade['student_id'], grade['grade']) for grade in changes['grades']], [(self.student2.id, 6)])
+        self.assertEqual([(row['model'], row['object_id']) for row in changes['deleted']], [('grade', self.grade1.id)])
+        self.assertEqual(changes['revision'], RevisionCounter.current())
+        self.assertEqual(changes_since(changes['revision'])['grades'], [])
+
+    def test_cascade_allocates_tombstone_revisions_in_blocks(self):
+        extra = [User.objects.create(username=f'extra{i}') for i in range(5)]
+        grade_ids = [self.grade1.id] + [
+            Grade.objects.create(student=student, lesson=self.lesson1, grade=5).id for student in extra
+        ]
+        head = RevisionCounter.current()
+
+        with CaptureQueriesContext(connection) as queries:
+            Lesson.objects.get(pk=self.lesson1.pk).delete()
+
+        # One block for the grades and one for the lesson.
+        self.assertEqual(len([query for query in queries if 'UPDATE "journal_revisioncounter"' in query['sql']]), 2)
+        deleted = changes_since(head)['deleted']
+        self.assertEqual(
+            sorted((row['model'], row['object_id']) for row in deleted),
+            sorted([('grade', grade_id) for grade_id in grade_ids] + [('lesson', self.lesson1.id)]),
+        )
+        self.assertEqual([row['revision'] for row in deleted], list(range(head + 1, head + 8)))
+
+    def test_changes_are_paged_in_revision_order(self):
+        first = changes_since(0, limit=2)
+        rest = changes_since(first['revision'], limit=2)
+
+        self.assertTrue(first['has_more'])
+        self.assertEqual([lesson['topic'] for lesson in first['lessons']], ['Algebra Basics', 'Geometry Introduction'])
+        self.assertEqual([grade['id'] for grade in rest['grades']], [self.grade1.id])
+        self.assertFalse(rest['has_more'])
+
+    def test_changes_endpoint_is_staff_only(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('api_changes')).status_code, 403)
+
+        self.teacher.is_staff = True
+        self.teacher.save()
+        data = self.client.get(reverse('api_changes'), {'since': self.lesson1.revision}).json()
+        self.assertEqual([lesson['id'] for lesson in data['lessons']], [self.lesson2.id])
+        self.assertEqual(self.client.get(reverse('api_changes'), {'since': 'x'}).status_code, 400)
+
+    def test_export_changes_command(self):
+        out = StringIO()
+        call_command('export_changes', '--since', str(self.lesson2.revision), stdout=out, stderr=StringIO())
+        self.assertEqual([line.split(',')[0] for line in out.getvalue().splitlines()], ['{"type": "grades"'])
+
+
+class GradeHistoryTests(JournalTestCase):
+
+    def set_grade(self, student, value):
+        url = reverse('set_grade', kwargs={'lesson_id': self.lesson1.id, 'student_id': student.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'student': student.id, 'lesson': self.lesson1.id, 'grade': value})
+
+    def test_set_grade_records_who_changed_what(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.set_grade(self.student1, 10)
+        self.set_grade(self.student1, 10)
+        self.set_grade(self.student2, 5)
+
+        self.assertEqual(
+            list(queries.grade_history(self.grade1.id).values_list('action', 'old_grade', 'new_grade', 'changed_by')),
+            [('updated', 8, 10, self.teacher.id)]
+        )
+        self.assertEqual(GradeHistory.objects.get(student_id=self.student2.id).action, 'created')
+
+    def test_entries_are_flushed_in_one_insert(self):
+        grade_id = self.grade1.id
+        collecting = history.collect(self.teacher)
+        buffer = collecting.__enter__()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade1.grade = 11
+            self.grade1.save()
+            self.grade1.delete()
+        self.assertEqual(len(buffer), 2)
+        self.assertFalse(GradeHistory.objects.exists())
+
+        with self.assertNumQueries(1):
+            collecting.__exit__(None, None, None)
+        self.assertEqual(
+            list(queries.grade_history(grade_id).values_list('action', flat=True)), ['updated', 'deleted']
+        )
+
+    def test_import_writes_history_batch_by_batch(self):
+        students = [User.objects.create(username=f'extra{i}') for i in range(6)]
+        self.students_group.user_set.add(*students)
+        self.school_class.student.add(*students)
+        rows = [
+            {'username': student.username, 'topic': lesson.topic, 'grade': 5}
+            for student in students for lesson in (self.lesson1, self.lesson2)
+        ]
+        written = []
+        write = GradeHistory.objects.bulk_create
+
+        def record_write(entries, *args, **kwargs):
+            written.append(len(entries))
+            return write(entries, *args, **kwargs)
+
+        with mock.patch.object(history, 'BUFFER_SIZE', 4), \
+                mock.patch.object(GradeHistory.objects, 'bulk_create', side_effect=record_write):
+            with history.collect(self.teacher) as buffer:
+                with self.captureOnCommitCallbacks(execute=True):
+                    GradeImporter(batch_size=3).run(rows)
+                self.assertLess(len(buffer), 4)
+
+        # The buffer is written whenever it reaches 4 entries, so it never holds more than one batch beyond that.
+        self.assertEqual(written, [6, 6])
+        self.assertEqual(GradeHistory.objects.count(), 12)
+
+    def test_failed_history_write_does_not_fail_the_change(self):
+        with mock.patch.object(GradeHistory.objects, 'bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('journal.history', 'ERROR'):
+            with history.collect(self.teacher):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Grade.objects.create(student=self.student2, lesson=self.lesson1, grade=3)
+        self.assertTrue(Grade.objects.filter(student=self.student2, lesson=self.lesson1).exists())
+
+    def test_rolled_back_changes_leave_no_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Grade.objects.create(student=self.student2, lesson=self.lesson1, grade=3)
+                raise RuntimeError
+        self.assertFalse(GradeHistory.objects.exists())
+
+    def test_bulk_path_records_only_changes(self):
+        with self.captureOnCommitCallbacks(execute=True), history.collect(self.teacher):
+            upsert_grades([
+                Grade(student=self.student1, lesson=self.lesson1, grade=8),
+                Grade(student=self.student2, lesson=self.lesson1, grade=7),
+            ])
+        entry = GradeHistory.objects.get()
+        self.assertEqual((entry.student_id, entry.action, entry.new_grade), (self.student2.id, 'created', 7))
+        self.assertEqual(entry.grade_id, Grade.objects.get(student=self.student2, lesson=self.lesson1).id)
+
+    def test_teacher_changes_in_range(self):
+        now = timezone.now()
+        GradeHistory.objects.bulk_create([
+            GradeHistory(grade_id=1, student_id=1, lesson_id=1, action='created', new_grade=5,
+                         changed_by=self.teacher, changed_at=now - timedelta(days=days))
+            for days in (0, 3, 10)
+        ])
+        changes = queries.teacher_changes(self.teacher, now - timedelta(days=5), now)
+        self.assertEqual([entry.changed_at for entry in changes], [now - timedelta(days=3)])
+
+    def test_history_is_read_only(self):
+        entry = GradeHistory.objects.create(grade_id=1, student_id=1, lesson_id=1, action='created', new_grade=5)
+        with self.assertRaises(ValueError):
+            entry.save()
+        User.objects.create_superuser('admin', 'admin@test.com', 'testpass123')
+        self.client.login(username='admin', password='testpass123')
+        self.assertEqual(self.client.get(reverse('admin:journal_gradehistory_changelist')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('admin:journal_gradehistory_add')).status_code, 403)
+
+
+class AsyncViewTests(JournalTestCase):
+
+    async def test_teacher_pages_under_asgi(self):
+        await self.async_client.aforce_login(self.teacher)
+
+        lessons = await self.async_client.get(reverse('teacher_lesson_list'))
+        detail = await self.async_client.get(reverse('teacher_lesson_detail', kwargs={'lesson_id': self.lesson1.id}))
+
+        self.assertContains(lessons, 'Algebra Basics')
+        self.assertContains(detail, 'Class 10A')
+        self.assertContains(detail, 'Hello, teacher1!')
+
+    async def test_student_pages_under_asgi(self):
+        await self.async_client.aforce_login(self.student1)
+
+        home = await self.async_client.get(reverse('home'))
+        grades = await self.async_client.get(reverse('grade_list'))
+        forbidden = await self.async_client.get(reverse('teacher_lesson_list'))
+
+        self.assertContains(home, 'Student')
+        self.assertContains(grades, 'Algebra Basics')
+        self.assertEqual(forbidden.status_code, 302)
+
+
+class MetricsTests(JournalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_requests_are_timed_and_recorded_per_view(self):
+        self.client.login(username='teacher1', password='testpass123')
+        for _ in range(3):
+            response = self.client.get(reverse('teacher_lesson_list'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, 0 duplicates", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        row = {row['view']: row for row in metrics.report()}['teacher_lesson_list']
+        self.assertEqual(row['requests'], 3)
+        self.assertGreater(row['queries']['p50'], 0)
+        self.assertGreater(row['template']['p99'], 0)
+        self.assertEqual(row['size']['p50'], len(response.content))
+
+    async def test_async_views_are_timed(self):
+        await self.async_client.aforce_login(self.student1)
+        response = await self.async_client.get(reverse('grade_list'))
+
+        self.assertEqual(response.status_code, 200)
+        row = {row['view']: row for row in metrics.report()}['grade_list']
+        self.assertGreater(row['queries']['p50'], 0)
+        self.assertGreater(row['template']['p50'], 0)
+
+    def test_repeated_statements_count_as_duplicates(self):
+        with metrics.track() as timings:
+            for lesson in Lesson.objects.order_by('id'):
+                lesson.subject.name
+
+        self.assertEqual(timings.queries, 3)
+        self.assertEqual(timings.duplicates, 1)
+
+    def test_metrics_page_is_staff_only(self):
+        self.client.login(username='teacher1', password='testpass123')
+        self.client.get(reverse('teacher_lesson_list'))
+        self.assertEqual(self.client.get(reverse('ops_metrics')).status_code, 302)
+
+        self.teacher.is_staff = True
+        self.teacher.save()
+        response = self.client.get(reverse('ops_metrics'))
+        self.assertContains(response, 'teacher_lesson_list')
+
+
+class SeedSchoolTests(TestCase):
+
+    def test_seed_school(self):
+        out = StringIO()
+        call_command('seed_school', '--students', '12', '--class-size', '5', '--days', '3', stdout=out)
+
+        self.assertIn('3 classes, 12 students, 45 lessons', out.getvalue())
+        self.assertEqual(SchoolClass.student.through.objects.count(), 12)
+        self.assertEqual(Grade.objects.filter(revision=0).count(), 0)
+        self.assertEqual(len(changes_since(0, limit=500)['lessons']), 45)
+        stats = sorted(StudentSubjectStats.objects.values_list('student_id', 'subject_id', 'term', 'count', 'total'))
+        rebuild_stats()
+        self.assertEqual(
+            stats, sorted(StudentSubjectStats.objects.values_list('student_id', 'subject_id', 'term', 'count', 'total'))
+        )
+        self.assertTrue(self.client.login(username='student11', password='schooldiary'))
+        self.assertEqual(self.client.get(reverse('grade_list')).status_code, 200)
+
+    def test_seed_school_is_reproducible_across_batches(self):
+        def seed(batch_size):
+            call_command('seed_school', '--students', '6', '--class-size', '3', '--today', '2024-09-06',
+                         '--lessons-per-day', '1', '--batch-size', batch_size, stdout=StringIO())
+            return (
+                sorted(Lesson.objects.values_list('topic', 'date')),
+                sorted(Grade.objects.values_list('lesson__topic', 'student__username', 'grade')),
+                sorted(StudentSubjectStats.objects.values_list('student__username', 'subject__name', 'count', 'total')),
+                sorted(LessonProgress.objects.values_list('lesson__topic', 'graded', 'roster')),
+            )
+
+        with transaction.atomic():
+            lessons, grades, stats, progress = seed('1000')
+            transaction.set_rollback(True)
+        self.assertEqual({day for _, day in lessons}, {date(2024, 9, day) for day in range(2, 7)})
+        self.assertEqual(len(grades), 10)
+        self.assertEqual(progress[0][1:], (1, 3))
+        self.assertEqual(seed('2'), (lessons, grades, stats, progress))
+
+    def test_refuses_to_seed_over_existing_data(self):
+        Subject.objects.create(name='Art')
+        with self.assertRaises(CommandError):
+            call_command('seed_school', '--students', '5', stdout=StringIO())
+
+
+class BenchmarkSuiteTests(JournalTestCase):
+
+    def test_every_view_is_benchmarked(self):
+        from types import SimpleNamespace
+        from benchmarks.suite import run_suite, url_names
+
+        school = SimpleNamespace(
+            lesson=self.lesson1, teacher=self.teacher, student=self.student1,
+            staff=User.objects.create_superuser('admin', 'admin@test.com', 'testpass123'),
+        )
+        results = run_suite(school, repeats=1)
+
+        self.assertEqual(set(results), set(url_names()))
+        self.assertEqual(results['home']['url'], '/')
+        self.assertGreater(results['teacher_lesson_list']['queries'], 0)
+
+
+@skipUnless(numpy, "NumPy is not installed")
+class TermAnalyticsTests(JournalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.physics = Subject.objects.create(name='Physics')
+        # 2025-1 runs from September; both days are Mondays.
+        monday, next_monday = date(2025, 9, 1), date(2025, 9, 8)
+        lessons = [
+            Lesson.objects.create(
+                topic=f'Lesson {n}', subject=subject, school_class=cls.school_class, teacher=cls.teacher, date=day,
+            )
+            for n, (subject, day) in enumerate([(cls.subject, monday), (cls.subject, next_monday), (cls.physics, monday)])
+        ]
+        Grade.objects.bulk_create([
+            Grade(lesson=lessons[0], student=cls.student1, grade=4),
+            Grade(lesson=lessons[0], student=cls.student2, grade=6),
+            Grade(lesson=lessons[1], student=cls.student1, grade=9),
+            Grade(lesson=lessons[1], student=cls.student2, grade=12),
+            Grade(lesson=lessons[2], student=cls.student1, grade=10),
+        ])
+
+    def test_term_report(self):
+        with self.assertNumQueries(3):
+            report = analytics.term_report('2025-1')
+
+        self.assertEqual((report['count'], report['students'], report['lessons']), (5, 2, 3))
+        self.assertEqual(report['mean'], 8.2)
+        self.assertEqual(report['histogram'], [0, 0, 0, 1, 0, 1, 0, 0, 1, 1, 0, 1])
+        maths, physics = report['subjects']
+        self.assertEqual((maths['subject_name'], maths['count'], maths['mean']), ('Mathematics', 4, 7.75))
+        self.assertEqual(maths['percentiles'], {25: 4, 50: 6, 75: 9, 90: 12})
+        self.assertEqual((physics['subject_name'], physics['mean']), ('Physics', 10))
+        self.assertEqual([row['school_class_name'] for row in report['classes']], ['Class 10A', 'Class 10A'])
+
+    def test_weekly_trends(self):
+        trends = analytics.term_report('2025-1', subject=self.subject)['trends']
+
+        self.assertEqual([row['week'] for row in trends], [date(2025, 9, 1), date(2025, 9, 8)])
+        self.assertEqual([row['mean'] for row in trends], [5, 10.5])
+        self.assertEqual([row['change'] for row in trends], [None, 5.5])
+
+    def test_report_page(self):
+        self.client.login(username='teacher1', password='testpass123')
+        response = self.client.get(reverse('analytics_report'), {'term': '2025-1'})
+
+        self.assertContains(response, 'Physics')
+        self.assertEqual(response.context['report']['count'], 5)
+
+        self.client.login(username='student1', password='testpass123')
+        self.assertEqual(self.client.get(reverse('analytics_report')).status_code, 302)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('term_analytics', '--term', '2025-1', '--class', str(self.school_class.id), stdout=out)
+
+        self.assertIn('2025-1: 5 grades, 2 students, 3 lessons, average 8.20', out.getvalue())
+        self.assertIn('Class 10A / Physics  1  10.00', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('term_analytics', '--term', 'autumn')
+
+
+class HotPathPlanTests(JournalTestCase):
+
+    def test_hot_paths_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hotpaths', '--fail-on-scan', stdout=out)
+        self.assertIn('No table scans.', out.getvalue())
+
 
 class IntegrationTests(JournalTestCase):
 
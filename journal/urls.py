@@ -1,12 +1,21 @@
-from django.urls import path
+from django.urls import include, path
 from django.views.generic import RedirectView
 from . import views
 
 urlpatterns = [
-    path('', RedirectView.as_view(pattern_name='teacher_lesson_list', permanent=False)),
+    path('', RedirectView.as_view(pattern_name='teacher_dashboard', permanent=False)),
+    path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('lessons/', views.teacher_lesson_list, name='teacher_lesson_list'),
     path('lessons/new/', views.teacher_lesson_create, name='teacher_lesson_create'),
     path('lessons/<int:lesson_id>/', views.teacher_lesson_detail, name='teacher_lesson_detail'),
+    path('lessons/<int:lesson_id>/grades/', views.bulk_grade, name='bulk_grade'),
     path('lessons/<int:lesson_id>/students/<int:student_id>/grade/', views.set_grade, name='set_grade'),
+    path('classes/<int:class_id>/subjects/<int:subject_id>/gradebook/', views.gradebook, name='gradebook'),
+    path('analytics/', views.analytics_report, name='analytics_report'),
+    path('search/', views.lesson_search, name='lesson_search'),
+    path('my/homework/', views.homework_feed, name='homework_feed'),
+    path('my/lessons/', views.student_lesson_list, name='student_lesson_list'),
     path('grades/', views.grade_list, name='grade_list'),
+    path('grades/export.csv', views.export_grades, name='export_grades'),
+    path('api/v1/', include('journal.api_urls')),
 ]
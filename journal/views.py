@@ -1,25 +1,78 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import Http404
+from datetime import datetime, time, timedelta
+
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, user_passes_test
-from users.roles import TEACHERS_GROUP, STUDENT_GROUP
-from .models import Lesson, Grade
-from .forms import LessonForm, GradeForm
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from users.roles import TEACHERS_GROUP, STUDENT_GROUP, ahas_role, aload_request_roles, has_role
+from .models import Lesson, Grade, SchoolClass, Subject
+from .forms import AnalyticsForm, LessonForm, GradeForm, BulkGradeFormSet, LessonFilterForm, GradeExportForm
+from .exports import acsv_lines, aexport_rows, csv_lines, export_queryset, export_rows
+from .gradebook import build_gradebook
+from .grading import upsert_grades
+from .pagination import apaginate, paginate
+from .stats import current_term, term_bounds
+from . import analytics, metrics, pagecache, queries, search
 from users.models import User
 
 
 def is_teacher(user):
-    return user.groups.filter(name=TEACHERS_GROUP).exists()
+    return has_role(user, TEACHERS_GROUP)
 
 
 def is_student(user):
-    return user.groups.filter(name=STUDENT_GROUP).exists()
+    return has_role(user, STUDENT_GROUP)
+
+
+def is_teacher_or_student(user):
+    return is_teacher(user) or is_student(user)
+
+
+def is_teacher_or_staff(user):
+    return user.is_staff or is_teacher(user)
+
+
+async def ais_teacher(user):
+    return await ahas_role(user, TEACHERS_GROUP)
+
+
+async def ais_student(user):
+    return await ahas_role(user, STUDENT_GROUP)
 
 
 @login_required
-@user_passes_test(is_teacher, login_url='/accounts/login/', redirect_field_name=None)
-def teacher_lesson_list(request):
-    lessons = Lesson.objects.filter(teacher=request.user).order_by('-date')
-    return render(request, 'journal/teacher_lesson_list.html', {'lessons': lessons})
+@user_passes_test(ais_teacher, login_url='/accounts/login/', redirect_field_name=None)
+async def teacher_lesson_list(request):
+    await aload_request_roles(request)
+    filter_form = LessonFilterForm(request.GET)
+    lessons = filter_form.filter(queries.teacher_lessons(request.user))
+    page = await apaginate(lessons, request.GET.get('cursor'), ordering=queries.LESSON_ORDERING)
+    return render(request, 'journal/teacher_lesson_list.html', {
+        'lessons': page.items,
+        'page': page,
+        'filter_form': filter_form,
+    })
+
+
+DASHBOARD_LESSONS = 10
+
+
+@login_required
+@user_passes_test(ais_teacher, login_url='/accounts/login/', redirect_field_name=None)
+async def teacher_dashboard(request):
+    await aload_request_roles(request)
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    upcoming = queries.teacher_upcoming_lessons(request.user, today)[:DASHBOARD_LESSONS]
+    to_grade = queries.teacher_lessons_to_grade(request.user, today)[:DASHBOARD_LESSONS]
+    return render(request, 'journal/teacher_dashboard.html', {
+        'upcoming': [lesson async for lesson in upcoming],
+        'to_grade': [lesson async for lesson in to_grade],
+        'graded_today': await queries.grades_entered(request.user, midnight).acount(),
+    })
 
 
 @login_required
@@ -37,43 +90,81 @@ def teacher_lesson_create(request):
     return render(request, 'journal/teacher_lesson_form.html', {'form': form})
 
 
-@login_required
-@user_passes_test(is_teacher, login_url='/accounts/login/', redirect_field_name=None)
-def teacher_lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
-    students = lesson.school_class.student.all()
-    grades = {grade.student.id: grade for grade in lesson.grades.all()}
+def _render_lesson_detail(request, lesson, formset=None):
+    return _lesson_detail_response(request, lesson, list(queries.lesson_roster_grades(lesson)), formset)
+
+
+def _lesson_detail_response(request, lesson, students, formset=None):
+    # lesson_roster_grades() sets lesson_grade only on students who have a grade.
+    grades = {}
+    for student in students:
+        grade = getattr(student, 'lesson_grade', None)
+        if grade is not None:
+            grade.lesson = lesson
+            grade.student = student
+            grades[student.id] = grade
+    if formset is None:
+        formset = BulkGradeFormSet(
+            initial=[
+                {'student': student.id, 'grade': grades[student.id].grade if student.id in grades else None}
+                for student in students
+            ],
+        )
+    forms = {str(form['student'].value()): form for form in formset.forms}
 
     student_grades = []
     for student in students:
         student_grades.append({
             'student': student,
-            'grade': grades.get(student.id)
+            'grade': grades.get(student.id),
+            'form': forms.get(str(student.id)),
         })
     return render(request, 'journal/teacher_lesson_detail.html', {
         'lesson': lesson,
-        'student_grades': student_grades
+        'student_grades': student_grades,
+        'formset': formset,
     })
 
 
+@login_required
+@user_passes_test(ais_teacher, login_url='/accounts/login/', redirect_field_name=None)
+async def teacher_lesson_detail(request, lesson_id):
+    await aload_request_roles(request)
+    lesson = await aget_object_or_404(queries.lesson_details(), id=lesson_id)
+    students = [student async for student in queries.lesson_roster_grades(lesson)]
+    return _lesson_detail_response(request, lesson, students)
+
+
+@login_required
+@user_passes_test(is_teacher, login_url='/accounts/login/', redirect_field_name=None)
+@require_POST
+def bulk_grade(request, lesson_id):
+    lesson = get_object_or_404(queries.lesson_details(), id=lesson_id)
+    roster = queries.lesson_roster(lesson).values_list('id', flat=True)
+    formset = BulkGradeFormSet(request.POST, roster=roster)
+    if formset.is_valid():
+        upsert_grades(
+            Grade(lesson=lesson, student_id=student_id, grade=value)
+            for student_id, value in formset.grades().items()
+        )
+        return redirect('teacher_lesson_detail', lesson_id=lesson.id)
+    return _render_lesson_detail(request, lesson, formset)
+
+
 @login_required
 @user_passes_test(is_teacher, login_url='/accounts/login/', redirect_field_name=None)
 def set_grade(request, lesson_id, student_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
     student = get_object_or_404(User, id=student_id)
 
-    grade_instance, created = Grade.objects.get_or_create(
-        lesson=lesson,
-        student=student,
-        defaults={'grade': 1}
-    )
+    grade_instance = Grade.objects.filter(lesson=lesson, student=student).first()
     if request.method == 'POST':
         form = GradeForm(request.POST, instance=grade_instance)
         if form.is_valid():
             form.save()
             return redirect('teacher_lesson_detail', lesson_id=lesson.id)
     else:
-        form = GradeForm(instance=grade_instance)
+        form = GradeForm(instance=grade_instance, initial={'student': student, 'lesson': lesson})
     return render(request, 'journal/set_grade.html', {
         'form': form,
         'student': student,
@@ -81,22 +172,150 @@ def set_grade(request, lesson_id, student_id):
     })
 
 
+@login_required
+@user_passes_test(is_teacher, login_url='/accounts/login/', redirect_field_name=None)
+def gradebook(request, class_id, subject_id):
+    school_class = get_object_or_404(SchoolClass, id=class_id)
+    subject = get_object_or_404(Subject, id=subject_id)
+    filter_form = LessonFilterForm(request.GET)
+    start, end = term_bounds(current_term())
+    if filter_form.is_valid():
+        start = filter_form.cleaned_data['date_from'] or start
+        end = filter_form.cleaned_data['date_to'] or end
+    return render(request, 'journal/gradebook.html', {
+        'school_class': school_class,
+        'subject': subject,
+        'start': start,
+        'end': end,
+        'gradebook': build_gradebook(school_class, subject, start, end),
+        'filter_form': filter_form,
+    })
+
+
 @login_required
 @user_passes_test(is_student, login_url='/accounts/login/', redirect_field_name=None)
 def student_lesson_list(request):
-    student_class = request.user.school_class.first()
-    if not student_class:
-        return Http404("You are not assigned to any class")
-    lessons = Lesson.objects.filter(school_class_student=student_class).distinct().order_by('-date')
-    return render(request, 'journal/student_lesson_list.html', {'lessons': lessons})
+    def get_context():
+        filter_form = LessonFilterForm(request.GET)
+        lessons = filter_form.filter(queries.student_lessons(request.user))
+        page = paginate(lessons, request.GET.get('cursor'), ordering=queries.LESSON_ORDERING)
+        return {
+            'lessons': page.items,
+            'page': page,
+            'filter_form': filter_form,
+        }
+
+    content = pagecache.student_fragment(
+        request, 'student_lesson_list', 'journal/student_lesson_list_content.html', get_context
+    )
+    return render(request, 'journal/student_lesson_list.html', {'content': content})
 
 
 @login_required
 @user_passes_test(is_student, login_url='/accounts/login/', redirect_field_name=None)
-def student_grade(request):
-    grades = Grade.objects.filter(student=request.user).select_related('lesson').order_by('-lesson__date')
-    return render(request, 'journal/student_grade.html', {'grades': grades})
+def homework_feed(request):
+    today = timezone.localdate()
+    monday = today - timedelta(days=today.weekday())
+
+    def get_context():
+        filter_form = LessonFilterForm(request.GET)
+        start, end = monday, monday + timedelta(days=6)
+        if filter_form.is_valid():
+            start = filter_form.cleaned_data['date_from'] or start
+            end = filter_form.cleaned_data['date_to'] or end
+        return {
+            'lessons': list(queries.student_homework(request.user, start, end)),
+            'start': start,
+            'end': end,
+            'filter_form': filter_form,
+        }
+
+    content = pagecache.student_fragment(
+        request, 'homework_feed', 'journal/homework_feed_content.html', get_context, monday
+    )
+    return render(request, 'journal/homework_feed.html', {'content': content})
+
+
+@login_required
+@user_passes_test(is_teacher_or_student, login_url='/accounts/login/', redirect_field_name=None)
+def lesson_search(request):
+    query = request.GET.get('q', '')
+    scope = queries.teacher_lessons if is_teacher(request.user) else queries.student_lessons
+    return render(request, 'journal/lesson_search.html', {
+        'query': query,
+        'results': search.search_lessons(query, scope(request.user)),
+    })
+
+
+@login_required
+@user_passes_test(ais_student, login_url='/accounts/login/', redirect_field_name=None)
+async def student_grade(request):
+    await aload_request_roles(request)
+    term = current_term()
+
+    async def get_context():
+        grouped = request.GET.get('group') == 'subject'
+        ordering = queries.GROUPED_GRADE_ORDERING if grouped else queries.GRADE_ORDERING
+        page = await apaginate(queries.student_grades(request.user), request.GET.get('cursor'), ordering=ordering)
+        return {
+            'grades': page.items,
+            'page': page,
+            'grouped': grouped,
+            'term': term,
+            'subject_stats': [stats async for stats in queries.student_term_stats(request.user, term)],
+        }
+
+    content = await pagecache.astudent_fragment(
+        request, 'student_grade', 'journal/student_grade_content.html', get_context, term
+    )
+    return render(request, 'journal/student_grade.html', {'content': content})
+
+
+@staff_member_required
+def export_grades(request):
+    form = GradeExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    grades = export_queryset(**form.cleaned_data)
+    if isinstance(request, ASGIRequest):
+        lines = acsv_lines(aexport_rows(grades))
+    else:
+        lines = csv_lines(export_rows(grades))
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="grades.csv"'
+    return response
+
+
+@login_required
+@user_passes_test(is_teacher_or_staff, login_url='/accounts/login/', redirect_field_name=None)
+def analytics_report(request):
+    form = AnalyticsForm(request.GET)
+    report = error = None
+    if form.is_valid():
+        try:
+            report = analytics.term_report(
+                form.cleaned_data['term'] or current_term(),
+                form.cleaned_data['school_class'],
+                form.cleaned_data['subject'],
+            )
+        except ImportError as exc:
+            error = str(exc)
+    return render(request, 'journal/analytics.html', {
+        'form': form,
+        'report': report,
+        'error': error,
+        'scale': analytics.GRADE_SCALE,
+        'percentiles': analytics.PERCENTILES,
+    })
+
+
+@staff_member_required
+def ops_metrics(request):
+    return render(request, 'journal/ops_metrics.html', {
+        'views': metrics.report(),
+        'sample_size': metrics.SAMPLE_SIZE,
+    })
 
 
-def grade_list(request):
-    return student_grade(request)
+async def grade_list(request):
+    return await student_grade(request)
@@ -0,0 +1,112 @@
+"""Time every journal and users view against a synthetic school and write the results as JSON.
+
+    python run_benchmarks.py --students 250 --class-size 25 --days 20 -o bench.json
+    python run_benchmarks.py --baseline bench.json          # fail if any view issues more queries
+
+The school is built in a throwaway test database, like the test suite's.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import django
+from django.conf import settings
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=250)
+    parser.add_argument('--class-size', type=int, default=25)
+    parser.add_argument('--years', type=int, default=1, help="School years of lessons and grades.")
+    parser.add_argument('--days', type=int, help="Only the most recent school days of that span (default: 20).")
+    parser.add_argument('--today', type=datetime.date.fromisoformat,
+                        help="Last day the school is seeded up to, as YYYY-MM-DD (default: 2025-05-30).")
+    parser.add_argument('--repeats', type=int, default=5, help="Timed requests per view.")
+    parser.add_argument('--view', action='append', help="Only benchmark this url name (repeatable).")
+    parser.add_argument('--output', '-o', help="Write the JSON here instead of stdout.")
+    parser.add_argument('--baseline', help="Earlier JSON output to compare query counts with.")
+    parser.add_argument('--max-query-growth', type=int, default=0,
+                        help="Extra queries per view tolerated against the baseline.")
+    parser.add_argument('--postgres', action='store_true')
+    args = parser.parse_args()
+
+    if args.postgres:
+        os.environ['DJANGO_DB_ENGINE'] = 'postgresql'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SchoolDiary.settings')
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from benchmarks.suite import SCHOOL_DAYS, query_regressions, run_suite
+    from journal.seeding import REFERENCE_DATE, seed_school
+    from users.models import User
+
+    # Fixed defaults keep the school the same size whatever the calendar says.
+    args.days = args.days or SCHOOL_DAYS
+    args.today = args.today or REFERENCE_DATE
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        started = time.perf_counter()
+        school = seed_school(students=args.students, class_size=args.class_size, years=args.years, days=args.days,
+                             today=args.today)
+        built = time.perf_counter() - started
+        school.staff = User.objects.create_superuser('admin', 'admin@example.com', 'benchmark')
+        results = run_suite(school, repeats=args.repeats, only=args.view)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'today': args.today.isoformat(),
+            'years': args.years,
+            'days': args.days,
+            'classes': school.classes,
+            'students': school.students,
+            'lessons': school.lessons,
+            'grades': school.grades,
+            'repeats': args.repeats,
+            'build_seconds': round(built, 2),
+        },
+        'views': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('today', 'years', 'days', 'students', 'lessons', 'grades'):
+            if baseline['meta'].get(key) != report['meta'][key]:
+                print(f"Baseline {key} was {baseline['meta'].get(key)}, not {report['meta'][key]}.", file=sys.stderr)
+        regressions = query_regressions(results, baseline['views'], args.max_query_growth)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
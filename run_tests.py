@@ -4,11 +4,25 @@ import django
 from django.conf import settings
 from django.test.utils import get_runner
 
+# Pass --postgres to run against PostgreSQL (configured by the POSTGRES_* variables),
+# e.g. a local stand-in: docker run -e POSTGRES_USER=schooldiary -e POSTGRES_PASSWORD=schooldiary -p 5432:5432 postgres:16
+# Pass --parallel [N] to split the suite over N processes (default: one per CPU),
+# and test labels such as journal.tests.JsonApiTests to run only part of it.
+
 if __name__ == "__main__":
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SchoolDiary.settings')
+    args = sys.argv[1:]
+    if '--postgres' in args:
+        args.remove('--postgres')
+        os.environ['DJANGO_DB_ENGINE'] = 'postgresql'
+    parallel = 0
+    if '--parallel' in args:
+        index = args.index('--parallel')
+        args.pop(index)
+        parallel = int(args.pop(index)) if index < len(args) and args[index].isdigit() else os.cpu_count()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SchoolDiary.test_settings')
     django.setup()
     TestRunner = get_runner(settings)
-    test_runner = TestRunner()
-    failures = test_runner.run_tests(["journal.tests"])
+    test_runner = TestRunner(parallel=parallel)
+    failures = test_runner.run_tests(args or ["journal.tests"])
     if failures:
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,19 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .roles import get_roles
+
+
+class RoleMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Under ASGI get_response is async and the coroutine is handed back to be awaited.
+        request.roles = SimpleLazyObject(lambda: get_roles(request.user))
+        return self.get_response(request)
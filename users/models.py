@@ -1,7 +1,8 @@
-
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
 class User(AbstractUser):
-    birth_date = models.DateField(null=True, blank=True, verbose_name='birth_date')
\ No newline at end of file
+    birth_date = models.DateField(null=True, blank=True, verbose_name='birth_date')
+    # Part of the roles cache key; bumped whenever the user's groups change.
+    roles_version = models.PositiveIntegerField(default=0, editable=False)
@@ -1,3 +1,75 @@
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import User
+
 TEACHERS_GROUP = 'teachers'
 STUDENTS_GROUP = 'students'
-STUDENT_GROUP = STUDENTS_GROUP
\ No newline at end of file
+STUDENT_GROUP = STUDENTS_GROUP
+
+ROLES_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user):
+    return f'users:roles:{user.pk}:{user.roles_version}'
+
+
+def get_roles(user):
+    """Return the user's group names, loaded at most once per request.
+
+    The set is memoised on the user instance and cached across requests under
+    the user's ``roles_version``. ``users.signals`` bumps that column whenever
+    the user's groups change, so a process whose cache still holds the old set
+    stops using it on the user's next request: the cache itself may be per process.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    try:
+        return user._roles
+    except AttributeError:
+        pass
+    roles = cache.get(_cache_key(user))
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(_cache_key(user), roles, ROLES_CACHE_TIMEOUT)
+    user._roles = roles
+    return roles
+
+
+async def aget_roles(user):
+    if not user.is_authenticated:
+        return frozenset()
+    try:
+        return user._roles
+    except AttributeError:
+        pass
+    roles = await cache.aget(_cache_key(user))
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        await cache.aset(_cache_key(user), roles, ROLES_CACHE_TIMEOUT)
+    user._roles = roles
+    return roles
+
+
+async def aload_request_roles(request):
+    """Resolve ``request.user`` and ``request.roles`` for an async view.
+
+    Both are lazy objects that query the database synchronously when a
+    template first touches them, which is not allowed in async code.
+    """
+    request.user = await request.auser()
+    request.roles = await aget_roles(request.user)
+    return request.roles
+
+
+def has_role(user, role):
+    return role in get_roles(user)
+
+
+async def ahas_role(user, role):
+    return role in await aget_roles(user)
+
+
+def invalidate_roles(*user_ids):
+    if user_ids:
+        User.objects.filter(pk__in=user_ids).update(roles_version=F('roles_version') + 1)
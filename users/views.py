@@ -5,7 +5,7 @@ from django.urls import reverse_lazy
 from django.views.generic import CreateView
 from .forms import UserRegisterForm
 from django.contrib.auth.decorators import login_required
-from .roles import TEACHERS_GROUP, STUDENTS_GROUP
+from .roles import TEACHERS_GROUP, STUDENTS_GROUP, aload_request_roles
 
 class RegisterView(CreateView):
     form_class = UserRegisterForm
@@ -18,12 +18,11 @@ class RegisterView(CreateView):
         return redirect('home')
 
 @login_required
-def home(request):
-    teacher = request.user.groups.filter(name=TEACHERS_GROUP).exists()
-    student = request.user.groups.filter(name=STUDENTS_GROUP).exists()
+async def home(request):
+    roles = await aload_request_roles(request)
     context = {
-        'teacher': teacher,
-        'student': student,
+        'is_teacher': TEACHERS_GROUP in roles,
+        'is_student': STUDENTS_GROUP in roles,
     }
     return render(request, 'users/home.html', context)
 